@@ -0,0 +1,138 @@
+import json
+from pathlib import Path
+from random import Random
+from typing import Dict
+
+# Name of the file with the setup of the fixture websites
+SETUP_FILE = 'setup.json'
+
+# Words used to build headlines
+_WORDS = ('market stocks bonds rates inflation fed earnings oil gold china europe banks tech shares dollar '
+          'yields economy growth recession jobs housing crypto bitcoin trade tariffs deal merger ipo profit '
+          'forecast outlook investors traders rally slump record week quarter central policy risk').split()
+
+
+def _headline(rng: Random) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))).capitalize()
+
+
+def _script(rng: Random, size: int) -> str:
+    # Inline state blobs make up most of the bytes of real news front pages
+    items = [{'id': rng.getrandbits(64), 'headline': _headline(rng), 'tags': rng.sample(_WORDS, 5)}
+             for _ in range(size // 160)]
+    return f'<script>window.__STATE__ = {json.dumps(items)};</script>'
+
+
+def _navigation(rng: Random, links: int) -> str:
+    items = ''.join(f'<li class="nav-item"><a href="/section/{rng.choice(_WORDS)}/{i}">{rng.choice(_WORDS)}</a></li>'
+                    for i in range(links))
+    return f'<nav class="site-nav"><ul class="nav-list">{items}</ul></nav>'
+
+
+def _story_list_page(rng: Random) -> str:
+    stories = ''.join(
+        f'<article class="story-package-module__story"><div class="story-meta"><span>{rng.randint(1, 59)} min ago'
+        f'</span></div><h3 class="story-headline"><a href="/news/articles/2023-06-{rng.randint(1, 30):02d}/'
+        f'{rng.getrandbits(48):x}">{_headline(rng)}</a></h3><p class="summary">{_headline(rng)}</p></article>'
+        for _ in range(400)
+    )
+    return (f'<!DOCTYPE html><html><head><title>Markets</title>{_script(rng, 900_000)}</head><body>'
+            f'{_navigation(rng, 600)}<main><section class="story-list">{stories}</section>'
+            f'<aside class="most-read">{_navigation(rng, 50)}</aside></main></body></html>')
+
+
+def _latest_news_page(rng: Random) -> str:
+    items = ''.join(
+        f'<li class="LatestNews-item"><div class="LatestNews-container">'
+        f'<time>{rng.randint(1, 12)}:{rng.randint(0, 59):02d}</time>'
+        f'<a class="LatestNews-headline" href="https://www.example-news.com/2023/06/{rng.randint(1, 30):02d}/'
+        f'{rng.getrandbits(40):x}.html" title="{_headline(rng)}">{_headline(rng)}</a></div></li>'
+        for _ in range(300)
+    )
+    trending = ''.join(
+        f'<div class="TrendingNowItem-container"><a href="https://www.example-news.com/video/{rng.getrandbits(40):x}">'
+        f'{_headline(rng)}</a></div>' for _ in range(50)
+    )
+    return (f'<html><head>{_script(rng, 400_000)}<style>{"body{margin:0}" * 5000}</style></head><body>'
+            f'{_navigation(rng, 300)}<div class="PageBuilder-container"><ul class="LatestNews-list">{items}</ul>'
+            f'<div class="TrendingNow-container">{trending}</div></div>{_script(rng, 300_000)}</body></html>')
+
+
+def _collection_page(rng: Random) -> str:
+    columns = ''.join(
+        '<div class="story-collection__column"><ul class="story-collection__list">' + ''.join(
+            f'<li class="story-collection__item"><div class="media-story-card"><a data-testid="Heading" '
+            f'href="/world/{rng.choice(_WORDS)}/{rng.getrandbits(48):x}-2023-06-{rng.randint(1, 30):02d}/">'
+            f'<span>{_headline(rng)}</span></a><p>{_headline(rng)}</p></div></li>' for _ in range(60)
+        ) + '</ul></div>' for _ in range(8)
+    )
+    return (f'<html><head>{_script(rng, 200_000)}</head><body>{_navigation(rng, 1200)}'
+            f'<div class="regular-page"><section class="story-collection top-stories">{columns}</section></div>'
+            f'<footer class="site-footer">{_navigation(rng, 200)}</footer></body></html>')
+
+
+# Setup of the fixture websites, crawl URLs are paths relative to the fixture server
+SETUP: Dict[str, dict] = {
+    'Markets': {
+        'name': 'Markets',
+        'target_url': 'https://www.example-markets.com',
+        'crawl_urls': ['markets-1.html', 'markets-2.html'],
+        'sections': ['story-list'],
+        'element': 'story-package-module__story',
+        'filter': '/news/articles/'
+    },
+    'LatestNews': {
+        'name': 'LatestNews',
+        'target_url': 'https://www.example-news.com',
+        'crawl_urls': ['latest-1.html', 'latest-2.html'],
+        'sections': ['LatestNews-list', 'TrendingNow-container'],
+        'element': None,
+        'filter': 'https://www.example-news.com/'
+    },
+    'World': {
+        'name': 'World',
+        'target_url': 'https://www.example-world.com',
+        'crawl_urls': ['world-1.html', 'world-2.html', 'world-3.html'],
+        'sections': ['story-collection top-stories'],
+        'element': 'story-collection__item',
+        'filter': '/world/'
+    }
+}
+
+_PAGES = {'markets': _story_list_page, 'latest': _latest_news_page, 'world': _collection_page}
+
+
+def generate(directory: Path, seed: int = 2023):
+    """Write the fixture pages and their setup file into a directory.
+
+    The pages are deterministic stand-ins for large news front pages: several hundred headlines in the
+    configured sections surrounded by navigation, inline scripts and styles.
+    A directory with recorded pages can be used instead, as long as it holds a 'setup.json' describing them.
+
+    Args:
+        directory (Path): The directory to write to.
+        seed (int): The seed of the generated content.
+
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = Random(seed)
+
+    for scraper_info in SETUP.values():
+        for crawl_url in scraper_info['crawl_urls']:
+            page = _PAGES[crawl_url.split('-')[0]](rng)
+            (directory / crawl_url).write_text(page, encoding='utf-8')
+
+    (directory / SETUP_FILE).write_text(json.dumps(SETUP, indent=2), encoding='utf-8')
+
+
+def load_setup(directory: Path) -> Dict[str, dict]:
+    """Read the setup file of a fixture directory.
+
+    Args:
+        directory (Path): The fixture directory.
+
+    Returns:
+        Dict[str, dict]: The setup of the fixture websites.
+
+    """
+    return json.loads((directory / SETUP_FILE).read_text(encoding='utf-8'))
@@ -0,0 +1,60 @@
+from collections import Counter
+from typing import Any
+
+# Collection methods which make a round trip to the server
+OPERATIONS = frozenset([
+    'find', 'find_one', 'insert_one', 'insert_many', 'delete_one', 'delete_many', 'update_one', 'update_many',
+    'find_one_and_update', 'bulk_write', 'create_index', 'count_documents', 'aggregate', 'watch'
+])
+
+
+class _CountingCollection:
+    """Collection proxy which counts round trips per collection. """
+
+    def __init__(self, collection, counter: Counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._collection, name)
+        if name in OPERATIONS:
+            self._counter[self._collection.name] += 1
+        return attribute
+
+
+class _CountingDatabase:
+    """Database proxy which hands out counting collections. """
+
+    def __init__(self, database, counter: Counter):
+        self._database = database
+        self._counter = counter
+
+    def __getitem__(self, name: str) -> _CountingCollection:
+        return _CountingCollection(self._database[name], self._counter)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+
+class CountingClient:
+    """MongoClient proxy which counts database operations per collection.
+
+    Works with a real 'MongoClient' connected to a local mongod as well as with 'mongomock'.
+
+    """
+
+    def __init__(self, client):
+        """Initialize the CountingClient object.
+
+        Args:
+            client: The MongoClient (or mongomock client) to wrap.
+
+        """
+        self._client = client
+        self.operations: Counter = Counter()
+
+    def __getitem__(self, name: str) -> _CountingDatabase:
+        return _CountingDatabase(self._client[name], self.operations)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import platform
+from io import StringIO
+from pathlib import Path
+from datetime import datetime, timezone
+from time import perf_counter
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from contextlib import nullcontext, redirect_stdout
+from typing import Dict, List, Optional
+
+# Benchmarks run from the repository root: python -m benchmarks.run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# The pipeline reads the database name from the environment
+os.environ.setdefault('MONGO_DATABASE_NAME', 'benchmark')
+
+from utils.http import HttpClient
+from utils.mongo import MongoDataBase
+from utils.page_cache import PageCache
+from scrapers.implicit_scraper import ImplicitLinkScraper
+from scrapers.parsers import resolve_parser
+from benchmarks.mongo import CountingClient
+from benchmarks.server import FixtureServer
+from benchmarks.fixtures import generate, load_setup
+
+
+def _connect(mongo_url: Optional[str]) -> CountingClient:
+    """Connect to a local mongod, or to an in-memory mongomock stand-in if no URL is given. """
+    if mongo_url is not None:
+        from pymongo import MongoClient
+        return CountingClient(MongoClient(mongo_url))
+
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit('mongomock is not installed: run "pip install mongomock" or pass --mongo URL of a local mongod')
+    return CountingClient(mongomock.MongoClient())
+
+
+def _run_site(scraper: ImplicitLinkScraper, client: HttpClient, database: MongoDataBase,
+              counting: CountingClient) -> Dict[str, float]:
+    """Benchmark one website: per-page stages, the whole 'start' and the database update. """
+    fetch = parse = extract = 0.0
+    pages = size = rows = 0
+
+    # Stage breakdown of every crawl URL
+    for crawl_url in scraper.crawl_urls:
+        t0 = perf_counter()
+        response = client.get(crawl_url)
+        t1 = perf_counter()
+        web_page = scraper._parse(response.content, scraper._encoding(response))
+        t2 = perf_counter()
+        data = scraper._scrape_page(web_page)
+        t3 = perf_counter()
+
+        fetch, parse, extract = fetch + t1 - t0, parse + t2 - t1, extract + t3 - t2
+        pages, size, rows = pages + 1, size + len(response.content), rows + len(data)
+
+    # The whole scrape as the worker runs it
+    t0 = perf_counter()
+    data = scraper.start()
+    t1 = perf_counter()
+
+    # The database synchronization
+    operations = counting.operations[scraper.name]
+    database.update(data=data, collection_name=scraper.name)
+    t2 = perf_counter()
+
+    return {
+        'pages': pages,
+        'bytes': size,
+        'rows': rows,
+        'fetch_ms': fetch * 1000,
+        'parse_ms_per_page': parse * 1000 / max(pages, 1),
+        'extract_ms_per_page': extract * 1000 / max(pages, 1),
+        'start_ms': (t1 - t0) * 1000,
+        'update_ms': (t2 - t1) * 1000,
+        'mongo_ops': counting.operations[scraper.name] - operations,
+        'inserted': database.inserted
+    }
+
+
+def _check_equivalence(setup: Dict[str, dict], client: HttpClient, cache: PageCache) -> Dict[str, bool]:
+    """Check that every parser backend, with and without the strainer and early stop, extracts the same rows. """
+    variants = [dict(parser=parser, strainer=strainer, early_stop=early_stop)
+                for parser in {'html.parser', resolve_parser('lxml')}
+                for strainer in (False, True) for early_stop in (False, True)]
+
+    equivalent = {}
+    for name, scraper_info in setup.items():
+        rows: List[list] = []
+        for variant in variants:
+            scraper = ImplicitLinkScraper(**{**scraper_info, **variant}, client=client, cache=cache)
+            pages = []
+            for crawl_url in scraper.crawl_urls:
+                response = client.get(crawl_url, stop=scraper._end_of_content())
+                data = scraper._scrape_page(scraper._parse(response.content, scraper._encoding(response)))
+                pages.append([(record.title, record.link) for record in data])
+            rows.append(pages)
+
+        # The reference is the plain setup: html.parser on the whole page
+        equivalent[name] = all(pages == rows[0] for pages in rows) and any(rows[0])
+        if not equivalent[name]:
+            print(f'Extracted rows of {name} differ between parser settings', file=sys.stderr)
+    return equivalent
+
+
+def run(fixtures: Path, cycles: int, mongo_url: Optional[str], warm: bool, verbose: bool) -> dict:
+    """Run the benchmark cycles over a fixture directory.
+
+    Args:
+        fixtures (Path): The directory with fixture pages and their 'setup.json'.
+        cycles (int): The number of cycles to run.
+        mongo_url (Optional[str]): The URL of a local mongod (mongomock is used if not given).
+        warm (bool): Keep the page cache between cycles, so unchanged pages are skipped.
+        verbose (bool): Show the output of the pipeline.
+
+    Returns:
+        dict: The benchmark results.
+
+    """
+    server = FixtureServer(fixtures)
+    counting = _connect(mongo_url)
+    database = MongoDataBase(cluster=counting)
+    client = HttpClient()
+    cache = PageCache()
+
+    # Crawl URLs are paths relative to the fixture server
+    setup = load_setup(fixtures)
+    for scraper_info in setup.values():
+        scraper_info['crawl_urls'] = [f'{server.url}/{path}' for path in scraper_info['crawl_urls']]
+
+    results = []
+    try:
+        for cycle in range(1, cycles + 1):
+            if not warm:
+                cache = PageCache()
+
+            sites, start = {}, perf_counter()
+            with nullcontext() if verbose else redirect_stdout(StringIO()):
+                for name, scraper_info in setup.items():
+                    scraper = ImplicitLinkScraper(**scraper_info, client=client, cache=cache)
+                    sites[name] = _run_site(scraper, client, database, counting)
+            duration = perf_counter() - start
+
+            pages = sum(site['pages'] for site in sites.values())
+            rows = sum(site['rows'] for site in sites.values())
+            busy = sum(site['fetch_ms'] + (site['parse_ms_per_page'] + site['extract_ms_per_page']) * site['pages']
+                       for site in sites.values()) / 1000
+            results.append({
+                'cycle': cycle,
+                'duration_s': duration,
+                'pages': pages,
+                'rows': rows,
+                'pages_per_s': pages / busy if busy else 0.0,
+                'rows_per_s': rows / busy if busy else 0.0,
+                'mongo_ops': sum(site['mongo_ops'] for site in sites.values()),
+                'sites': sites
+            })
+
+        # Faster settings must not change what is extracted
+        with nullcontext() if verbose else redirect_stdout(StringIO()):
+            equivalent = _check_equivalence(setup, client, cache)
+    finally:
+        client.close()
+        server.close()
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'mongo': 'mongod' if mongo_url is not None else 'mongomock',
+        'warm': warm,
+        'cycles': results,
+        'equivalent': equivalent
+    }
+
+
+def main():
+    # Create an argument parser
+    parser = ArgumentParser(description='Offline benchmark of the scraping pipeline')
+    parser.add_argument('-f', '--fixtures', type=Path,
+                        help='Directory with recorded pages and setup.json (synthetic pages are generated if not set)')
+    parser.add_argument('-c', '--cycles', type=int, default=3, help='Number of cycles to run')
+    parser.add_argument('-m', '--mongo', help='URL of a local mongod (in-memory mongomock is used if not given)')
+    parser.add_argument('-o', '--output', type=Path, help='Append the results as a JSON line to this file')
+    parser.add_argument('--warm', action='store_true', help='Keep the page cache between cycles')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the output of the pipeline')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        fixtures = args.fixtures
+        if fixtures is None:
+            fixtures = Path(directory)
+            generate(fixtures)
+
+        results = run(fixtures, args.cycles, args.mongo, args.warm, args.verbose)
+
+    line = json.dumps(results)
+    if args.output is not None:
+        with args.output.open('a', encoding='utf-8') as output:
+            output.write(line + '\n')
+    print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from pathlib import Path
+from threading import Thread
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """Serves fixture files without logging every request. """
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureServer:
+    """Local HTTP server for fixture pages, so benchmarks need no network. """
+
+    def __init__(self, directory: Path):
+        """Start serving a directory on a free local port.
+
+        Args:
+            directory (Path): The directory with fixture pages.
+
+        """
+        handler = partial(_QuietHandler, directory=str(directory))
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._thread = Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server. """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def close(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
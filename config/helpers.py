@@ -1,4 +1,6 @@
 import os
+import socket
+from typing import List, Optional, Tuple
 
 from .settings import *
 
@@ -8,21 +10,24 @@ class NoEnvironmentVar(Exception):
         super().__init__(f'Environment variable {variable} does not exist')
 
 
-def _get_env_variable(variable: str):
+def _get_env_variable(variable: str, default: Optional[str] = None):
     """Retrieve the value of the specified environment variable.
 
     Args:
         variable (str): The name of the environment variable.
+        default (Optional[str]): The value to use if the variable does not exist.
 
     Returns:
         str: The value of the environment variable.
 
     Raises:
-        NoEnvironmentVar: If the specified environment variable does not exist.
+        NoEnvironmentVar: If the specified environment variable does not exist and no default is given.
 
     """
     # Check if the 'variable' environment variable exists
     if variable not in os.environ:
+        if default is not None:
+            return default
         raise NoEnvironmentVar(variable)
 
     return os.environ.get(variable)
@@ -104,3 +109,266 @@ def get_slack_channel() -> str:
 
     """
     return _get_env_variable(SLACK_CHANNEL)
+
+
+def get_max_workers() -> int:
+    """Retrieve the global number of concurrent crawl jobs from environment variables.
+
+    Returns:
+        int: The maximum number of crawl URLs fetched at the same time (16 by default).
+
+    """
+    return int(_get_env_variable(MAX_WORKERS, '16'))
+
+
+def get_max_per_host() -> int:
+    """Retrieve the number of concurrent crawl jobs per host from environment variables.
+
+    Returns:
+        int: The maximum number of crawl URLs fetched from one host at the same time (2 by default).
+
+    """
+    return int(_get_env_variable(MAX_PER_HOST, '2'))
+
+
+def get_http_timeouts() -> Tuple[float, float]:
+    """Retrieve the HTTP connect and read timeouts from environment variables.
+
+    Returns:
+        Tuple[float, float]: The connect (5 by default) and read (20 by default) timeouts in seconds.
+
+    """
+    return float(_get_env_variable(HTTP_CONNECT_TIMEOUT, '5')), float(_get_env_variable(HTTP_READ_TIMEOUT, '20'))
+
+
+def get_http_retries() -> int:
+    """Retrieve the number of HTTP retries from environment variables.
+
+    Returns:
+        int: The number of times a failed request is retried (3 by default).
+
+    """
+    return int(_get_env_variable(HTTP_RETRIES, '3'))
+
+
+def get_http_backoff() -> float:
+    """Retrieve the HTTP retry backoff factor from environment variables.
+
+    Returns:
+        float: The backoff factor between retries in seconds (0.5 by default).
+
+    """
+    return float(_get_env_variable(HTTP_BACKOFF, '0.5'))
+
+
+def get_snapshot_dir() -> Optional[str]:
+    """Retrieve the directory titles of the previous cycle are persisted to from environment variables.
+
+    Returns:
+        Optional[str]: The path of the snapshot directory, or None if snapshots are kept in memory only.
+
+    """
+    return os.environ.get(SNAPSHOT_DIR)
+
+
+def get_check_refresh_interval() -> int:
+    """Retrieve the minimal interval between 'check' refreshes of a collection from environment variables.
+
+    Returns:
+        int: The interval in seconds (600 by default).
+
+    """
+    return int(_get_env_variable(CHECK_REFRESH_INTERVAL, '600'))
+
+
+def get_min_interval() -> int:
+    """Retrieve the minimal interval between scrapes of one website from environment variables.
+
+    Returns:
+        int: The interval in seconds (60 by default).
+
+    """
+    return int(_get_env_variable(MIN_INTERVAL, '60'))
+
+
+def get_max_interval() -> int:
+    """Retrieve the maximal interval between scrapes of one website from environment variables.
+
+    Returns:
+        int: The interval in seconds (3600 by default).
+
+    """
+    return int(_get_env_variable(MAX_INTERVAL, '3600'))
+
+
+def get_slack_window() -> float:
+    """Retrieve the time window in which Slack messages are combined from environment variables.
+
+    Returns:
+        float: The window in seconds (5 by default).
+
+    """
+    return float(_get_env_variable(SLACK_WINDOW, '5'))
+
+
+def get_slack_queue_size() -> int:
+    """Retrieve the number of Slack messages which may wait to be sent from environment variables.
+
+    Returns:
+        int: The size of the queue (100 by default).
+
+    """
+    return int(_get_env_variable(SLACK_QUEUE_SIZE, '100'))
+
+
+def get_metrics_file() -> Optional[str]:
+    """Retrieve the file metrics are exported to from environment variables.
+
+    Returns:
+        Optional[str]: The path of the Prometheus text file, or None if it is not set.
+
+    """
+    return os.environ.get(METRICS_FILE)
+
+
+def get_metrics_port() -> Optional[int]:
+    """Retrieve the port of the metrics endpoint from environment variables.
+
+    Returns:
+        Optional[int]: The port of the Prometheus endpoint, or None if it is not set.
+
+    """
+    port = os.environ.get(METRICS_PORT)
+    return int(port) if port is not None else None
+
+
+def get_parse_workers() -> int:
+    """Retrieve the number of processes parsing pages from environment variables.
+
+    Returns:
+        int: The number of parsing processes (0 by default, pages are parsed in the crawl threads).
+
+    """
+    return int(_get_env_variable(PARSE_WORKERS, '0'))
+
+
+def get_sharding() -> bool:
+    """Retrieve whether websites are shared between several workers from environment variables.
+
+    Returns:
+        bool: True if sharding is enabled (disabled by default).
+
+    """
+    return _get_env_variable(SHARDING, '0') == '1'
+
+
+def get_worker_id() -> str:
+    """Retrieve the unique name of the worker from environment variables.
+
+    Returns:
+        str: The name of the worker (host name and process id by default).
+
+    """
+    return _get_env_variable(WORKER_ID, f'{socket.gethostname()}-{os.getpid()}')
+
+
+def get_lease_ttl() -> int:
+    """Retrieve the time a worker owns a website without renewing its lease from environment variables.
+
+    Returns:
+        int: The lease time in seconds (300 by default).
+
+    """
+    return int(_get_env_variable(LEASE_TTL, '300'))
+
+
+def get_max_page_bytes() -> int:
+    """Retrieve the maximal number of bytes read from one page from environment variables.
+
+    Returns:
+        int: The maximal size of a page body in bytes (10 MB by default).
+
+    """
+    return int(_get_env_variable(MAX_PAGE_BYTES, str(10 * 1024 * 1024)))
+
+
+def get_archive_dir() -> Optional[str]:
+    """Retrieve the directory fetched pages are archived to from environment variables.
+
+    Returns:
+        Optional[str]: The path of the page archive, or None if pages are not archived.
+
+    """
+    return os.environ.get(ARCHIVE_DIR)
+
+
+def get_writer_queue_size() -> int:
+    """Retrieve the number of scraped batches waiting to be written from environment variables.
+
+    Returns:
+        int: The maximal number of waiting batches (32 by default).
+
+    """
+    return int(_get_env_variable(WRITER_QUEUE_SIZE, '32'))
+
+
+def get_writer_flush_interval() -> float:
+    """Retrieve the time in which scraped batches are collected into one write from environment variables.
+
+    Returns:
+        float: The flush interval in seconds (1 by default).
+
+    """
+    return float(_get_env_variable(WRITER_FLUSH_INTERVAL, '1'))
+
+
+def get_strip_query_params() -> List[str]:
+    """Retrieve the query parameters dropped from links from environment variables.
+
+    Returns:
+        List[str]: The parameter names, a trailing '*' matches a prefix (common tracking parameters by default).
+
+    """
+    params = _get_env_variable(STRIP_QUERY_PARAMS, 'utm_*,fbclid,gclid,dclid,msclkid,yclid,mc_cid,mc_eid,_ga,igshid')
+    return [param.strip() for param in params.split(',') if param.strip()]
+
+
+def get_check_ttl() -> Optional[int]:
+    """Retrieve the time after which documents not seen on their website expire from environment variables.
+
+    Returns:
+        Optional[int]: The time in seconds since the last 'check', or None if documents never expire.
+
+    """
+    ttl = os.environ.get(CHECK_TTL)
+    return int(ttl) if ttl is not None else None
+
+
+def get_breaker_threshold() -> int:
+    """Retrieve the number of consecutive failures which stop requests to a host from environment variables.
+
+    Returns:
+        int: The number of failures (3 by default).
+
+    """
+    return int(_get_env_variable(BREAKER_THRESHOLD, '3'))
+
+
+def get_breaker_cooldown() -> float:
+    """Retrieve the time requests to a failing host are stopped at first from environment variables.
+
+    Returns:
+        float: The cooldown in seconds, doubled every time the host fails again (30 by default).
+
+    """
+    return float(_get_env_variable(BREAKER_COOLDOWN, '30'))
+
+
+def get_site_deadline() -> float:
+    """Retrieve the time budget of all crawl URLs of a website in one cycle from environment variables.
+
+    Returns:
+        float: The budget in seconds (60 by default).
+
+    """
+    return float(_get_env_variable(SITE_DEADLINE, '60'))
@@ -15,3 +15,84 @@ MONGO_DATABASE_NAME = 'MONGO_DATABASE_NAME'
 
 # This is a name of Environment Variable for MongoDB configuration file (collection name which stores it)
 MONGO_SETUP = 'MONGO_SETUP'
+
+# This is a name of Environment Variable for the global number of concurrent crawl jobs
+MAX_WORKERS = 'MAX_WORKERS'
+
+# This is a name of Environment Variable for the number of concurrent crawl jobs against one host
+MAX_PER_HOST = 'MAX_PER_HOST'
+
+# This is a name of Environment Variable for the HTTP connect timeout (in seconds)
+HTTP_CONNECT_TIMEOUT = 'HTTP_CONNECT_TIMEOUT'
+
+# This is a name of Environment Variable for the HTTP read timeout (in seconds)
+HTTP_READ_TIMEOUT = 'HTTP_READ_TIMEOUT'
+
+# This is a name of Environment Variable for the number of HTTP retries
+HTTP_RETRIES = 'HTTP_RETRIES'
+
+# This is a name of Environment Variable for the HTTP retry backoff factor (in seconds)
+HTTP_BACKOFF = 'HTTP_BACKOFF'
+
+# This is a name of Environment Variable for the directory titles of the previous cycle are persisted to
+SNAPSHOT_DIR = 'SNAPSHOT_DIR'
+
+# This is a name of Environment Variable for the minimal interval between 'check' refreshes of a collection (in seconds)
+CHECK_REFRESH_INTERVAL = 'CHECK_REFRESH_INTERVAL'
+
+# This is a name of Environment Variable for the minimal interval between scrapes of one website (in seconds)
+MIN_INTERVAL = 'MIN_INTERVAL'
+
+# This is a name of Environment Variable for the maximal interval between scrapes of one website (in seconds)
+MAX_INTERVAL = 'MAX_INTERVAL'
+
+# This is a name of Environment Variable for the time window in which Slack messages are combined (in seconds)
+SLACK_WINDOW = 'SLACK_WINDOW'
+
+# This is a name of Environment Variable for the number of Slack messages waiting to be sent
+SLACK_QUEUE_SIZE = 'SLACK_QUEUE_SIZE'
+
+# This is a name of Environment Variable for the file metrics are exported to in the Prometheus text format
+METRICS_FILE = 'METRICS_FILE'
+
+# This is a name of Environment Variable for the port of the Prometheus metrics endpoint
+METRICS_PORT = 'METRICS_PORT'
+
+# This is a name of Environment Variable for the number of processes parsing pages (0 parses in the crawl threads)
+PARSE_WORKERS = 'PARSE_WORKERS'
+
+# This is a name of Environment Variable which enables sharing websites between several workers ('1' to enable)
+SHARDING = 'SHARDING'
+
+# This is a name of Environment Variable for the unique name of a worker (host name and process id by default)
+WORKER_ID = 'WORKER_ID'
+
+# This is a name of Environment Variable for the time a worker owns a website without renewing its lease (in seconds)
+LEASE_TTL = 'LEASE_TTL'
+
+# This is a name of Environment Variable for the maximal number of bytes read from one page (larger pages are cut)
+MAX_PAGE_BYTES = 'MAX_PAGE_BYTES'
+
+# This is a name of Environment Variable for the directory fetched pages are archived to (nothing is archived if unset)
+ARCHIVE_DIR = 'ARCHIVE_DIR'
+
+# This is a name of Environment Variable for the number of scraped batches waiting to be written to the database
+WRITER_QUEUE_SIZE = 'WRITER_QUEUE_SIZE'
+
+# This is a name of Environment Variable for the time in which scraped batches are collected into one write (in seconds)
+WRITER_FLUSH_INTERVAL = 'WRITER_FLUSH_INTERVAL'
+
+# This is a name of Environment Variable for the query parameters dropped from links (comma separated, '*' for prefixes)
+STRIP_QUERY_PARAMS = 'STRIP_QUERY_PARAMS'
+
+# This is a name of Environment Variable for the time after which documents not seen on their website expire (seconds)
+CHECK_TTL = 'CHECK_TTL'
+
+# This is a name of Environment Variable for the number of consecutive failures which stop requests to a host
+BREAKER_THRESHOLD = 'BREAKER_THRESHOLD'
+
+# This is a name of Environment Variable for the time requests to a failing host are stopped at first (in seconds)
+BREAKER_COOLDOWN = 'BREAKER_COOLDOWN'
+
+# This is a name of Environment Variable for the time budget of all crawl URLs of a website in one cycle (in seconds)
+SITE_DEADLINE = 'SITE_DEADLINE'
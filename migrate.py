@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from argparse import ArgumentParser
+
+from utils.mongo import MongoDataBase
+
+# Create an argument parser
+parser = ArgumentParser(description='Convert string timestamps of older versions into UTC dates (run once)')
+
+# Add an optional argument to specify the name of the web-page in the setup file
+parser.add_argument('-w', '--webpage', help='Unnecessary argument: key of web-page in setup file (all by default)')
+
+# Add an optional argument with the UTC offset of the clock the old timestamps were written with
+parser.add_argument('-o', '--offset', type=float, help='UTC offset in hours of the old timestamps (local by default)')
+
+# Parse the command-line arguments
+args = parser.parse_args()
+
+# Old timestamps were written from the local clock of the worker
+offset = timedelta(hours=args.offset) if args.offset is not None else datetime.now().astimezone().utcoffset()
+
+# Establish a connection to the MongoDB cluster
+cluster = MongoDataBase()
+
+try:
+    # Collections of the requested website or of all websites (named after the 'name' of the website)
+    if args.webpage is not None and args.webpage not in cluster.setup_file:
+        parser.error(f'{args.webpage} is not in the setup file')
+    names = [cluster.setup_file[args.webpage]['name']] if args.webpage is not None \
+        else [scraper_info['name'] for scraper_info in cluster.setup_file.values()]
+
+    for name in names:
+        cluster.migrate_timestamps(name, offset)
+
+    # Create the recency indexes on the converted collections
+    cluster.ensure_indexes(names)
+
+finally:
+    # Close the connection to the MongoDB cluster
+    cluster.close()
@@ -1,38 +1,150 @@
-from time import sleep
+from typing import Dict
 
+from utils.http import HttpClient
 from utils.mongo import MongoDataBase
-from utils.slack import message_to_slack
-from config.helpers import get_time_interval
+from utils.page_cache import PageCache
+from utils.slack import SlackDispatcher
+from utils.writer import MongoWriter
+from utils.scheduler import Scheduler
+from utils.leases import LeaseManager
+from utils.archive import PageArchive
+from utils.snapshot import SnapshotStore
+from utils.metrics import get_metrics
+from config.helpers import get_min_interval, get_sharding, get_archive_dir, get_snapshot_dir
+from scrapers.pool import ParsePool
+from scrapers.crawler import Crawler
 from scrapers.implicit_scraper import ImplicitLinkScraper
 
 
-# Establish a connection to the MongoDB cluster
-cluster = MongoDataBase()
+# Start the parsing processes first, they are forked while there are no other threads (None if disabled)
+pool = ParsePool.create()
+
+# Establish a connection to the MongoDB cluster, remembering the titles of every previous cycle
+# (kept in memory only when sharing websites, a website may come back after another worker has changed it)
+cluster = MongoDataBase(snapshots=SnapshotStore(None if get_sharding() else get_snapshot_dir()))
+
+# Create the HTTP client shared by all scrapers (connections are kept alive between cycles)
+client = HttpClient()
+
+# Create the cache of scraped pages, which lets unchanged pages be skipped
+cache = PageCache()
+
+# Create the archive fetched pages are recorded to, so they can be replayed with scrape_test.py (None if disabled)
+archive = PageArchive(get_archive_dir()) if get_archive_dir() is not None else None
+
+# Create the concurrent crawl engine
+crawler = Crawler()
+
+# Create the writer which updates the database in the background
+writer = MongoWriter(cluster)
+
+# Create the dispatcher which sends Slack messages in the background
+slack = SlackDispatcher()
+
+# Create the scheduler which decides when each website is scraped
+scheduler = Scheduler()
+
+# Share websites with other workers through leases in the database (None if this worker scrapes all of them)
+leases = LeaseManager(cluster.database) if get_sharding() else None
+
+# Scrapers of all websites with the setup they were created from, kept between cycles
+scrapers: Dict[str, ImplicitLinkScraper] = {}
+setups: Dict[str, dict] = {}
 
 try:
+    # Make sure the collections of all websites are indexed before the first update
+    cluster.ensure_indexes(scraper_info['name'] for scraper_info in cluster.setup_file.values())
+
     # Endless River
     while True:
-        # Iterate over websites described in setup test_file
-        for _, scraper_info in cluster.setup_file.items():
-            # Creating scraper with information from setup test_file
-            scraper = ImplicitLinkScraper(**scraper_info)
+        # Rebuild scrapers only when the setup test_file has changed
+        if cluster.refresh_setup() or not setups:
+            setup = {scraper_info['name']: scraper_info for scraper_info in cluster.setup_file.values()}
+
+            # Drop websites which were removed from setup
+            for name in set(setups) - set(setup):
+                cache.forget(scrapers[name].cache_scope)
+                del scrapers[name], setups[name]
+
+            # Creating scrapers with information from setup test_file for new or changed websites
+            for name, scraper_info in setup.items():
+                if setups.get(name) != scraper_info:
+                    # Pages scraped under the old settings must be scraped again
+                    if name in scrapers:
+                        cache.forget(scrapers[name].cache_scope)
 
-            # Scrape the web-page
-            page_data = scraper.start()
+                    print(f'Creating scraper for {name}')
+                    scrapers[name] = ImplicitLinkScraper(
+                        **scraper_info, client=client, cache=cache, pool=pool, archive=archive
+                    )
+                    setups[name] = scraper_info
 
-            # Update the MongoDB database with the scraped data and retrieve the message
-            cluster.update(data=page_data, collection_name=scraper.name)
+            if leases is None:
+                scheduler.sync(setups.keys())
 
-            # Send the message to Slack
-            message_to_slack(cluster.message)
+        # Renew the leases and schedule only the websites this worker owns
+        if leases is not None:
+            owned = leases.claim(setups.keys())
+            scheduler.sync(owned)
 
-        # Sleep
-        sleep(get_time_interval())
+            # Websites of other workers are written by them
+            cluster.forget(set(setups) - owned)
+
+        # Websites which are due to be scraped
+        due = [scrapers[name] for name in scheduler.due()]
+
+        # Scrape all web-pages concurrently, sites are handed to the database writer as soon as they are done
+        for scraper, page_data in crawler.crawl(due):
+            # The lease may have been lost during a long crawl, the website is written by its new owner then
+            if leases is not None and not leases.holds(scraper.name):
+                print(f'Lease of {scraper.name} was lost during the crawl, its data is not written')
+                scheduler.report(scraper.name, 0)
+                continue
+
+            writer.submit(scraper.name, page_data, scraper.failed, scraper.unchanged, scraper.partial)
+
+        # Report the websites which could not be fetched completely (hosts which keep failing are not requested)
+        unhealthy = [f'{scraper.name} ({scraper.health.state})' for scraper in due if not scraper.health.ok]
+        if unhealthy:
+            print(f'Unhealthy websites: {", ".join(unhealthy)}')
+
+        # Report how many pages were skipped as unchanged and export the metrics of the cycle
+        if due:
+            cache.report()
+            get_metrics().flush()
+
+        # Wait until the next website is due or a write has finished, but wake up often enough to notice setup changes
+        for result in writer.results(timeout=min(scheduler.wait_time(), get_min_interval())):
+            # Send the message about the inserted documents to Slack (without waiting for it)
+            slack.send(result.message)
+
+            # Plan the next scrape of the website from the number of new items
+            scheduler.report(result.collection_name, result.inserted, result.failed)
 
 except Exception as e:
     # Handle other exceptions
     print(repr(e))
 
 finally:
+    # Let the other workers take over the websites of this worker
+    if leases is not None:
+        leases.release()
+
+    # Write the remaining batches and send their messages to Slack
+    writer.close(timeout=30)
+    for result in writer.results():
+        slack.send(result.message)
+
+    # Send the remaining Slack messages
+    slack.close(timeout=30)
+
+    # Stop the crawl engine and the parsing processes
+    crawler.close()
+    if pool is not None:
+        pool.close()
+
+    # Close pooled HTTP connections
+    client.close()
+
     # Close the connection to the MongoDB cluster
     cluster.close()
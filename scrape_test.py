@@ -1,5 +1,17 @@
+import json
+import pstats
+import cProfile
+import tracemalloc
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+from statistics import median
 from argparse import ArgumentParser
+from typing import Dict, List, Tuple
 
+from requests import Response
+
+from utils.archive import PageArchive
 from utils.mongo import MongoData, MongoDataBase
 from scrapers.implicit_scraper import ImplicitLinkScraper
 
@@ -9,27 +21,171 @@ parser = ArgumentParser()
 # Add an optional argument to specify the name of the web-page in the setup file
 parser.add_argument('-w', '--webpage', help='Unnecessary argument: name of web-page in setup file')
 
+# Add optional arguments to record fetched pages to an archive or to replay them from it
+parser.add_argument('--record', type=Path, help='Record the fetched pages (and the setup) to this archive directory')
+parser.add_argument('--replay', type=Path, help='Take the pages from this archive directory instead of fetching them')
+parser.add_argument('--all', action='store_true', help='With --replay, extract every archived version of the pages')
+
+# Add optional arguments to find out why scraping a web-page is slow
+parser.add_argument('--file', type=Path, help='Scrape this saved HTML page instead of the crawl URLs (no network)')
+parser.add_argument('--setup', type=Path, help='Take the setup of websites from this JSON file instead of the database')
+parser.add_argument('--repeat', type=int, default=1, help='Scrape N times and print min/median/p95 of every stage')
+parser.add_argument('--profile', action='store_true', help='Profile the scrape with cProfile, print top functions')
+parser.add_argument('--profile-out', type=Path, help='With --profile, save the statistics to this pstats file')
+parser.add_argument('--memory', action='store_true', help='Print peak memory and top allocations of parsing/extraction')
+
 # Parse the command-line arguments
 args = parser.parse_args()
 
-# Establish a connection to the MongoDB cluster
-cluster = MongoDataBase()
+# Setup of websites saved with the archive, so replaying needs no database (edit it to try other settings)
+archive_setup = args.setup or (args.replay / 'setup.json' if args.replay is not None else None)
 
-# Get file with info
-file = cluster.setup_file
+if archive_setup is not None and archive_setup.exists():
+    file = json.loads(archive_setup.read_text(encoding='utf-8'))
+else:
+    # Establish a connection to the MongoDB cluster and get file with info
+    file = MongoDataBase().setup_file
 
 # Retrieve information base on the command-line argument
 test_info = file.get(args.webpage) if args.webpage in file \
     else list(file.values())[-1]  # or use the last value from the file
 
+# Open the archive pages are recorded to or replayed from
+directory = args.replay or args.record
+archive = PageArchive(directory) if directory is not None else None
+
 # Creating scraper with test information
-scraper = ImplicitLinkScraper(**test_info)
+scraper = ImplicitLinkScraper(**test_info, archive=archive, replay=args.replay is not None)
+
+# Save the setup next to the recorded pages
+if args.record is not None:
+    setup = json.loads((args.record / 'setup.json').read_text(encoding='utf-8')) \
+        if (args.record / 'setup.json').exists() else {}
+    setup[test_info['name']] = test_info
+    (args.record / 'setup.json').write_text(json.dumps(setup, indent=2, default=str), encoding='utf-8')
+
+
+def load_pages() -> List[Tuple[str, Response]]:
+    """Fetch the pages to measure: the saved HTML page, or every crawl URL (from the archive when replaying).
+
+    Returns:
+        List[Tuple[str, Response]]: The URL and the response of every page.
+
+    """
+    if args.file is not None:
+        response = Response()
+        response.url = args.file.resolve().as_uri()
+        response.status_code = 200
+        response._content = args.file.read_bytes()
+        return [(response.url, response)]
+    return [(crawl_url, scraper._fetch(crawl_url, None)) for crawl_url in scraper.crawl_urls]
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Get the value below which the given share of the values lie (nearest rank). """
+    return sorted(values)[max(ceil(share * len(values)) - 1, 0)]
+
+
+def measure():
+    """Scrape the pages 'repeat' times and print the timings of the fetch, parse and extract stages. """
+    timings: Dict[str, List[float]] = {'fetch': [], 'parse': [], 'extract': [], 'total': []}
+    profiler = cProfile.Profile() if args.profile else None
+
+    for _ in range(max(args.repeat, 1)):
+        if profiler is not None:
+            profiler.enable()
+
+        # Stages are summed over all pages of a run
+        fetch = parse = extract = 0.0
+        rows = 0
+        start = perf_counter()
+        pages = load_pages()
+        fetch += perf_counter() - start
+
+        for url, response in pages:
+            start = perf_counter()
+            web_page = scraper._parse(response.content, scraper._encoding(response))
+            parse += perf_counter() - start
 
-# Scrape the web-page
-page_data = scraper.start()
+            start = perf_counter()
+            rows += len(scraper._scrape_page(web_page))
+            extract += perf_counter() - start
+
+        if profiler is not None:
+            profiler.disable()
+
+        for stage, seconds in (('fetch', fetch), ('parse', parse), ('extract', extract)):
+            timings[stage].append(seconds)
+        timings['total'].append(fetch + parse + extract)
+
+    print(f'{scraper.name}: {rows} elements from {len(pages)} pages, {len(timings["total"])} runs')
+    for stage, values in timings.items():
+        print(f'{stage:>8}: min {min(values) * 1000:9.2f} ms, median {median(values) * 1000:9.2f} ms, '
+              f'p95 {percentile(values, 0.95) * 1000:9.2f} ms')
+
+    if profiler is not None:
+        # Top functions by the time spent in them and in everything they call
+        pstats.Stats(profiler).strip_dirs().sort_stats('cumulative').print_stats(30)
+
+        # The file can be opened with 'snakeviz' or turned into a flamegraph with 'flameprof'
+        if args.profile_out is not None:
+            profiler.dump_stats(args.profile_out)
+            print(f'Profile saved to {args.profile_out}')
+
+
+def measure_memory():
+    """Scrape the pages once while tracing allocations and print the peaks and the top allocating lines. """
+    pages = load_pages()
+
+    tracemalloc.start()
+    for url, response in pages:
+        encoding = scraper._encoding(response)
+
+        # Peak above the memory held before the stage
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        web_page = scraper._parse(response.content, encoding)
+        parse_peak = tracemalloc.get_traced_memory()[1] - base
+
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        before = tracemalloc.take_snapshot()
+        data = scraper._scrape_page(web_page)
+        extract_peak = tracemalloc.get_traced_memory()[1] - base
+        after = tracemalloc.take_snapshot()
+
+        print(f'{url}: {len(data)} elements, parse peak {parse_peak / 2 ** 20:.2f} MB, '
+              f'extract peak {extract_peak / 2 ** 20:.2f} MB')
+
+        # Lines which allocated the memory still held after the extraction (the scraped records)
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        for stat in [stat for stat in stats if stat.size_diff > 0][:10]:
+            print(f'    {stat}')
+    tracemalloc.stop()
+
+
+if args.profile or args.memory or args.repeat > 1 or args.file is not None:
+    # Scrape in this thread only, so every stage is measured
+    measure()
+    if args.memory:
+        measure_memory()
+
+elif args.replay is not None and args.all:
+    # Extract every archived version of the crawl URLs
+    pages, rows, start = 0, 0, perf_counter()
+    for response in archive.iter_responses(scraper.crawl_urls):
+        data = scraper._scrape_page(scraper._parse(response.content, scraper._encoding(response)))
+        print(f'{response.url}: {len(data)} elements')
+        pages, rows = pages + 1, rows + len(data)
+    print(f'Extracted {rows} elements from {pages} archived pages in {perf_counter() - start:.2f} seconds')
 
-# Check if there is data in the page_data DataFrame
-if not page_data.empty:
-    print(page_data[MongoData.Title].values)
 else:
-    print('Nothing to show!')
+    # Scrape the web-page
+    page_data = scraper.start()
+
+    # Check if there is data in the page_data batch
+    if not page_data.empty:
+        print(page_data.column(MongoData.Title))
+    else:
+        print('Nothing to show!')
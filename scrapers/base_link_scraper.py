@@ -1,12 +1,13 @@
 from abc import ABCMeta, abstractmethod
-from pandas import DataFrame
-from re import compile, findall
-from typing import Optional, Tuple, List
-from bs4 import BeautifulSoup as BSoup, Tag
+from typing import Callable, Optional, Tuple, List, Set
+from bs4 import BeautifulSoup as BSoup, SoupStrainer, Tag
 from bs4.element import PageElement, ResultSet
 
-from utils.mongo import MongoData
+from utils.records import Record, RecordBatch
+from utils.metrics import get_metrics
 from scrapers.base_scraper import BaseScraper
+from utils.urls import UrlCanonicalizer, get_canonicalizer, link_key
+from scrapers.extraction import ExtractionPlan, get_plan
 
 
 class BaseLinkScraper(BaseScraper, metaclass=ABCMeta):
@@ -27,7 +28,46 @@ class BaseLinkScraper(BaseScraper, metaclass=ABCMeta):
         """Specify the sections on pages to extract data from. """
         pass
 
-    def _get_lnk_title(self, tag: Tag | PageElement) -> Tuple[Optional[str], Optional[str]]:
+    @property
+    def strainer(self) -> bool:
+        """Specify whether only the subtrees of 'sections' should be built when parsing pages. """
+        return True
+
+    @property
+    def strip_params(self) -> Optional[List[str]]:
+        """The query parameters dropped from links (STRIP_QUERY_PARAMS if None). """
+        return None
+
+    @property
+    def canonicalizer(self) -> UrlCanonicalizer:
+        """The canonicalizer of links of the website. """
+        strip_params = self.strip_params
+        return get_canonicalizer(self.target_url, tuple(strip_params) if strip_params is not None else None)
+
+    @property
+    def early_stop(self) -> bool:
+        """Specify whether downloading a page stops as soon as all 'sections' were received. """
+        return False
+
+    @property
+    def plan(self) -> ExtractionPlan:
+        """The precompiled extraction plan for 'sections', 'element' and 'link_filter'. """
+        return get_plan(tuple(self.sections), self.element, self.link_filter)
+
+    @property
+    def parse_only(self) -> Optional[SoupStrainer]:
+        # Everything outside the sections is never looked at
+        if self.strainer:
+            return self.plan.strainer
+        return None
+
+    def _end_of_content(self) -> Optional[Callable[[bytes], bool]]:
+        # Only the first tag of every section is extracted, nothing after them is needed
+        if self.early_stop:
+            return self.plan.watcher().feed_chunk
+        return None
+
+    def _get_lnk_title(self, tag: Tag | PageElement, plan: ExtractionPlan) -> Tuple[Optional[str], Optional[str]]:
         """Extract the link and title from a given tag.
 
         This method extracts the link and title from the given tag based on the regex pattern
@@ -35,6 +75,7 @@ class BaseLinkScraper(BaseScraper, metaclass=ABCMeta):
 
         Args:
             tag (Tag | PageElement): The BeautifulSoup Tag or PageElement object to extract the link and title from.
+            plan (ExtractionPlan): The precompiled extraction plan.
 
         Returns:
             Tuple[Optional[str], Optional[str]]: A tuple containing the extracted link and title,
@@ -42,20 +83,19 @@ class BaseLinkScraper(BaseScraper, metaclass=ABCMeta):
 
         """
 
+        canonicalize = self.canonicalizer.canonicalize
+
         def processing(obj: Tag | PageElement) -> Tuple[Optional[str], Optional[str]]:
             # Extract the link and title
             link, text = obj.get('href', ''), obj.text
             # Checking for empty string
             if link == '' or text == '':
                 return None, None
-            # If it doesn't contain the full URL
-            if len(findall(r'https\S*', link)) == 0:
-                # Prepend the target_url to the link
-                link = self.target_url + link
-            return link, text.replace('â€™', '\'').strip()
+            # Resolve relative links against the target_url and drop tracking parts
+            return canonicalize(link), text.replace('â€™', '\'').strip()
 
         # Find all tags within the given tag that match the specified regex pattern
-        sections: ResultSet = tag.find_all('a', attrs={'href': compile(self.link_filter)})
+        sections: ResultSet = tag.find_all('a', attrs={'href': plan.link_filter})
 
         # Iterate over the found tags
         for section in sections:
@@ -67,38 +107,57 @@ class BaseLinkScraper(BaseScraper, metaclass=ABCMeta):
         # If nothing found inside tag then trying to extract link from tag itself
         return processing(tag)
 
-    def _scrape_page(self, web_page: BSoup) -> DataFrame:
-        # Search through all given sections
-        for section in self.sections:
-            # Find all tags with the specified class in the page
-            tags: Tag = web_page.find(class_=section)
+    def _scrape_page(self, web_page: BSoup) -> RecordBatch:
+        metrics = get_metrics()
+        with metrics.timer('extract', self.name):
+            data = self._extract(web_page)
+        metrics.inc('rows_extracted', self.name, len(data))
+        return data
 
-            # If 'element' is set, then find all its instances
-            if self.element is not None and tags is not None:
-                tags: ResultSet = tags.find_all(class_=self.element)
+    def _extract(self, web_page: BSoup) -> RecordBatch:
+        """Extract unique links and titles from all sections of the page.
 
-            if tags is None:
-                continue
+        Args:
+            web_page (BSoup): The BeautifulSoup object representing the web page.
+
+        Returns:
+            RecordBatch: A RecordBatch containing the extracted data.
+
+        """
+        # Rows found on the page and the dedup keys of their links (the same as the unique key in MongoDB)
+        records: List[Record] = []
+        keys: Set[bytes] = set()
+
+        # Get UTC time once for the whole page
+        time = self._get_article_time()
+
+        # Find all sections in a single traversal of the page
+        plan = self.plan
+        for section in plan.find_sections(web_page):
+            # If 'element' is set, then find all its instances, otherwise use the children of the section
+            tags = section.find_all(class_=plan.element) if plan.element is not None else section.contents
 
             for tag in tags:
+                # Text between tags holds no links
+                if not isinstance(tag, Tag):
+                    continue
+
                 try:
                     # Extract link and title from the tag
-                    link, title = self._get_lnk_title(tag)
-
-                    if link is not None \
-                            and link not in self._data[MongoData.Link].values:
-                        # Get UTC time
-                        time = self._get_article_time()
-                        # Append unique link, title and UTC time to DataFrame
-                        self._data.loc[len(self._data)] = {
-                            MongoData.Title: title,
-                            MongoData.Link: link,
-                            MongoData.Creation: time,
-                            MongoData.Check: time
-                        }
+                    link, title = self._get_lnk_title(tag, plan)
+
+                    if link is None:
+                        continue
+
+                    key = link_key(link)
+                    if key not in keys:
+                        # Append unique link, title and UTC time to the records
+                        keys.add(key)
+                        records.append(Record(title, link, time, time))
 
                 except Exception as error:
                     # Handle any exceptions that occur during extraction
                     print(repr(error))
+                    get_metrics().inc('extract_errors', self.name)
 
-        return self._data
+        return RecordBatch(records)
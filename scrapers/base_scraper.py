@@ -1,12 +1,26 @@
+import json
 from abc import ABC, ABCMeta, abstractmethod
+from hashlib import blake2b
 
-from typing import List
-from requests import Session
-from datetime import datetime
-from pandas import DataFrame, concat
-from bs4 import BeautifulSoup as BSoup
+from time import monotonic
+from typing import Callable, List, Optional, Set, TYPE_CHECKING
+from requests import RequestException, Response
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from bs4 import BeautifulSoup as BSoup, SoupStrainer
 
-from utils.mongo import MongoData
+from utils.records import Record, RecordBatch
+from utils.http import CircuitOpen, DeadlineExceeded, HttpClient, declared_encoding, get_default_client, \
+    is_utf8, sniff_encoding
+from utils.breaker import SiteHealth
+from utils.metrics import get_metrics
+from utils.archive import PageArchive
+from utils.page_cache import CachedPage, PageCache, get_default_cache
+from scrapers.parsers import BYTES_PARSERS, DEFAULT_PARSER
+from config.helpers import get_max_page_bytes, get_site_deadline
+
+if TYPE_CHECKING:
+    from scrapers.pool import ParsePool
 
 
 class BaseScraper(ABC, metaclass=ABCMeta):
@@ -17,18 +31,67 @@ class BaseScraper(ABC, metaclass=ABCMeta):
 
     """
 
-    def __init__(self):
+    def __init__(self,
+                 client: Optional[HttpClient] = None,
+                 cache: Optional[PageCache] = None,
+                 pool: Optional['ParsePool'] = None,
+                 archive: Optional[PageArchive] = None,
+                 replay: bool = False):
         """Initialize the BaseScraper object.
 
-        Initializes an empty DataFrame to store scraped data.
+        Args:
+            client (Optional[HttpClient]): The HTTP client used to fetch pages (shared default client if not given).
+            cache (Optional[PageCache]): The cache of previously scraped pages (shared default cache if not given).
+            pool (Optional[ParsePool]): The processes pages are parsed in (parsed in the calling thread if not given).
+            archive (Optional[PageArchive]): The archive fetched pages are recorded to (not recorded if not given).
+            replay (bool): Take pages from the archive instead of fetching them.
 
         """
-        self._data: DataFrame = DataFrame(columns=[
-            MongoData.Title,
-            MongoData.Link,
-            MongoData.Creation,
-            MongoData.Check
-        ])
+        # HTTP client with pooled keep-alive connections
+        self._client: HttpClient = client or get_default_client()
+
+        # Validators and data of pages scraped on previous cycles
+        self._cache: PageCache = cache or get_default_cache()
+
+        # Processes parsing pages and extracting data
+        self._pool: Optional['ParsePool'] = pool
+
+        # Archive pages are recorded to or replayed from
+        self._archive: Optional[PageArchive] = archive
+        self._replay = replay and archive is not None
+
+        # Whether any crawl URL had new content since the last 'collect'
+        self._changed = False
+
+        # Crawl URLs which could not be fetched since the last 'collect'
+        self._failures: Set[str] = set()
+
+        # Crawl URLs skipped without a request since the last 'collect', because their host is cooling down
+        self._skipped: Set[str] = set()
+
+        # Failed crawl URLs since the last 'collect' whose data of a previous cycle is not known
+        self._lost: Set[str] = set()
+
+        # Description of the last fetch error since the last 'collect'
+        self._error: Optional[str] = None
+
+        # Whether every crawl URL could not be fetched on the last 'collect'
+        self._failed = False
+
+        # Whether the last 'collect' found data, but none of it changed since the previous cycle
+        self._unchanged = False
+
+        # Whether the last 'collect' misses the items of some failed crawl URLs
+        self._partial = False
+
+        # Health of the site after the last 'collect'
+        self._health = SiteHealth()
+
+        # The 'time.monotonic' time by which the crawl URLs of this cycle must be fetched (set by the first 'crawl')
+        self._deadline: Optional[float] = None
+
+        # Encoding guessed for pages of the site which declare none (guessed once per site)
+        self._sniffed_encoding: Optional[str] = None
 
     @property
     @abstractmethod
@@ -48,70 +111,361 @@ class BaseScraper(ABC, metaclass=ABCMeta):
         """The list of URLs to crawl and scrape data from. """
         pass
 
+    @property
+    def setup(self) -> Optional[dict]:
+        """The arguments which recreate this scraper in a parsing process (None if it cannot be recreated). """
+        return None
+
+    @property
+    def cache_scope(self) -> str:
+        """The part of the page cache this scraper uses (pages scraped under another setup are scraped again). """
+        setup = self.setup
+        if setup is None:
+            return type(self).__name__
+        return blake2b(json.dumps(setup, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+    @property
+    def failed(self) -> bool:
+        """Whether none of the crawl URLs could be fetched on the last scrape. """
+        return self._failed
+
+    @property
+    def unchanged(self) -> bool:
+        """Whether the last scrape found data, but none of it changed (its check time still has to be refreshed). """
+        return self._unchanged
+
+    @property
+    def partial(self) -> bool:
+        """Whether some crawl URLs failed on the last scrape and their items are unknown (they must not be removed). """
+        return self._partial
+
+    @property
+    def health(self) -> SiteHealth:
+        """The health of the site after the last scrape. """
+        return self._health
+
+    @property
+    def time_budget(self) -> float:
+        """The number of seconds all crawl URLs of the site may take in one cycle (the rest is skipped). """
+        return get_site_deadline()
+
+    @property
+    def parser(self) -> str:
+        """The BeautifulSoup tree builder used to parse pages. """
+        return DEFAULT_PARSER
+
+    @property
+    def parse_only(self) -> Optional[SoupStrainer]:
+        """Restrict parsing to the matching parts of pages (the whole page is parsed if None). """
+        return None
+
+    @property
+    def max_bytes(self) -> int:
+        """The maximal number of bytes read from a page (the rest of larger pages is not downloaded). """
+        return get_max_page_bytes()
+
+    def _end_of_content(self) -> Optional[Callable[[bytes], bool]]:
+        """Create a function which is fed the chunks of a page and tells when the rest of it is not needed.
+
+        Returns:
+            Optional[Callable[[bytes], bool]]: The function for one page, or None if whole pages are read.
+
+        """
+        return None
+
+    def _encoding(self, response: Response) -> str:
+        """Get the encoding of a page: the declared one, UTF-8 if the page decodes so, or the one guessed for the site.
+
+        Args:
+            response (Response): The response of the page.
+
+        Returns:
+            str: The canonical codec name.
+
+        """
+        encoding = declared_encoding(response)
+        if encoding is not None:
+            return encoding
+
+        # Strict decoding is cheap and right for most pages (an ASCII page is valid UTF-8 as well)
+        if is_utf8(response.content):
+            return 'utf-8'
+
+        # Guessing analyses the whole text, so it is done only for the first page of the site which is not UTF-8
+        if self._sniffed_encoding is None:
+            self._sniffed_encoding = sniff_encoding(response)
+            print(f'Pages of {self.name} declare no encoding, guessed \"{self._sniffed_encoding}\"')
+        return self._sniffed_encoding
+
+    def _parse(self, markup: bytes, encoding: str) -> BSoup:
+        """Parse a page with the configured tree builder and restriction.
+
+        Args:
+            markup (bytes): The raw page to parse.
+            encoding (str): The encoding of the page.
+
+        Returns:
+            BSoup: The BeautifulSoup object representing the page.
+
+        """
+        # Parsers written in C decode the bytes themselves
+        if self.parser in BYTES_PARSERS:
+            return BSoup(markup, self.parser, parse_only=self.parse_only, from_encoding=encoding)
+        return BSoup(markup.decode(encoding, 'replace'), self.parser, parse_only=self.parse_only)
+
     @abstractmethod
-    def _scrape_page(self, web_page: BSoup) -> DataFrame:
+    def _scrape_page(self, web_page: BSoup) -> RecordBatch:
         """Scrape a web page and extract relevant data.
 
         This is an abstract method that must be implemented by subclasses.
-        It takes a BeautifulSoup object representing a web page and returns a DataFrame with scraped data.
+        It takes a BeautifulSoup object representing a web page and returns a RecordBatch with data scraped
+        from this page only. It must not keep state between calls, since pages may be scraped concurrently.
 
         Args:
             web_page (BSoup): The BeautifulSoup object representing the web page to be scraped.
 
         Returns:
-            DataFrame: A DataFrame containing the scraped data.
+            RecordBatch: A RecordBatch containing the scraped data.
 
         """
         pass
 
     @staticmethod
-    def _get_article_time() -> str:
-        """Get the current time with UTC offset.
+    def _get_article_time() -> datetime:
+        """Get the current UTC time.
 
         Returns:
-            str: The current time with UTC offset in the format 'YYYY-MM-DD UTC HH:MM'.
+            datetime: The current time in UTC, stored as a BSON date.
 
         """
-        return datetime.now().strftime('%Y-%m-%d UTC %H:%M')
+        return datetime.now(timezone.utc)
 
-    def start(self) -> DataFrame:
-        """Scrape data from a web pages provided in 'crawl_urls' attribute.
+    def _fetch(self, crawl_url: str, cached: Optional[CachedPage]) -> Response:
+        """Fetch a crawl URL, or take its latest recorded version from the archive when replaying.
+
+        Args:
+            crawl_url (str): The URL to fetch.
+            cached (Optional[CachedPage]): The state of the page on the previous cycle.
 
         Returns:
-            DataFrame: The scraped data as a DataFrame.
+            Response: The received response.
+
+        Raises:
+            RequestException: If the request failed or the page was never recorded.
 
         """
-        # List of scraped data
-        scraped_data: List[DataFrame] = []
+        if self._replay:
+            response = self._archive.replay(crawl_url)
+            if response is None:
+                raise RequestException(f'{crawl_url} is not in the archive')
+            return response
 
-        # Scrape through all URLs in the given list
-        for crawl_url in self.crawl_urls:
-            # Create a session object
-            session = Session()
+        return self._client.get(
+            crawl_url,
+            headers=cached.headers if cached is not None else None,
+            max_bytes=self.max_bytes,
+            stop=self._end_of_content(),
+            deadline=self._deadline
+        )
+
+    def crawl(self, crawl_url: str) -> Optional[RecordBatch]:
+        """Fetch a single crawl URL and scrape it.
+
+        This method is safe to call concurrently for different URLs of the same scraper.
+
+        Args:
+            crawl_url (str): The URL to fetch and scrape.
+
+        Returns:
+            Optional[RecordBatch]: The scraped data, or None if nothing was scraped.
+
+        """
+        metrics = get_metrics()
+
+        # The budget of the cycle starts with its first crawl URL
+        if self._deadline is None:
+            self._deadline = monotonic() + self.time_budget
+
+        # State of the page on the previous cycle
+        cached = self._cache.get(crawl_url, self.cache_scope)
+
+        try:
+            # Send a (conditional) GET request to the specified URL through the shared client
+            with metrics.timer('fetch', self.name):
+                response = self._fetch(crawl_url, cached)
+        except CircuitOpen as error:
+            # Nothing was sent, the host is cooling down
+            print(error)
+            metrics.inc('circuit_skips', self.name)
+            self._skipped.add(crawl_url)
+            self._failures.add(crawl_url)
+            self._error = str(error)
+            return self._keep(crawl_url, cached)
+        except DeadlineExceeded as error:
+            print(f'{error} (time budget of {self.name} is {self.time_budget:.0f} seconds)')
+            metrics.inc('deadline_exceeded', self.name)
+            self._failures.add(crawl_url)
+            self._error = str(error)
+            return self._keep(crawl_url, cached)
+        except RequestException as error:
+            print(f'{error!r} occurred while connecting to {crawl_url}')
+            metrics.inc('fetch_errors', self.name)
+            self._failures.add(crawl_url)
+            self._error = repr(error)
+            return self._keep(crawl_url, cached)
+
+        metrics.inc('bytes_downloaded', self.name, len(response.content))
+
+        # The page was not modified since the previous cycle
+        if response.status_code == 304 and cached is not None:
+            print(f'Page {crawl_url} was not modified')
+            return self._reuse(cached.data)
+
+        if not response.ok or response.status_code == 304:
+            print(f'<{response.status_code}> Error occurred while connecting to {crawl_url}')
+            metrics.inc('fetch_errors', self.name)
+            self._failures.add(crawl_url)
+            self._error = f'<{response.status_code}> {crawl_url}'
+            return self._keep(crawl_url, cached)
+
+        # Keep the page for replaying it later
+        if self._archive is not None and not self._replay:
+            self._archive.record(crawl_url, response)
+
+        # The page content is identical to the previous cycle
+        digest = self._cache.digest(response.content)
+        if cached is not None and cached.digest == digest:
+            print(f'Page {crawl_url} has not changed')
+            return self._reuse(cached.data)
+
+        # Invoke the provided function on the parsed page and return the result
+        self._cache.miss()
+        print(f'Scraping page {crawl_url}')
+        new_data = self._scrape_markup(response.content, self._encoding(response))
+        self._changed = True
+
+        if new_data.empty:
+            print(f'Received an empty page: nothing were found')
+            return None
+
+        # Remember the page for the next cycle
+        self._cache.put(crawl_url, response, digest, new_data, self.cache_scope)
+
+        print(f'Scrape completed: found {len(new_data)} elements on the page')
+        return new_data
+
+    def _scrape_markup(self, markup: bytes, encoding: str) -> RecordBatch:
+        """Parse a page and scrape it, in a parsing process if a pool was given.
+
+        Args:
+            markup (bytes): The raw page to scrape.
+            encoding (str): The encoding of the page.
+
+        Returns:
+            RecordBatch: The scraped data.
+
+        """
+        metrics = get_metrics()
+
+        if self._pool is not None and self.setup is not None:
+            try:
+                rows, parse, extract = self._pool.scrape(type(self), self.setup, markup, encoding)
+            except BrokenProcessPool as error:
+                # Keep scraping in this thread
+                print(f'{error!r} occurred in the parsing processes, parsing in the crawl threads')
+                self._pool = None
+            else:
+                metrics.observe('parse', self.name, parse)
+                metrics.observe('extract', self.name, extract)
+                metrics.inc('rows_extracted', self.name, len(rows))
 
-            # Send a GET request to the specified URL with a custom User-Agent header
-            response = session.get(crawl_url, headers={'User-Agent': 'Mozilla/5.0'})
+                # Add the scrape time to the compact rows
+                time = self._get_article_time()
+                return RecordBatch(Record(title, link, time, time) for title, link in rows)
 
-            # Close session
-            session.close()
+        with metrics.timer('parse', self.name):
+            web_page = self._parse(markup, encoding)
+        return self._scrape_page(web_page)
 
-            if not response.ok:
-                print(f'<{response.status_code}> Error occurred while connecting to {crawl_url}')
-                continue
+    def _reuse(self, data: RecordBatch) -> RecordBatch:
+        """Reuse data scraped from an unchanged page on a previous cycle.
 
-            # Invoke the provided function on the parsed page and return the result
-            print(f'Scraping page {crawl_url}')
-            new_data = self._scrape_page(BSoup(response.text, 'html.parser'))
+        Args:
+            data (RecordBatch): The cached data of the page.
+
+        Returns:
+            RecordBatch: A copy of the data with the refreshed check time.
+
+        """
+        self._cache.hit()
+        return data.with_check(self._get_article_time())
+
+    def _keep(self, crawl_url: str, cached: Optional[CachedPage]) -> Optional[RecordBatch]:
+        """Keep the data of a page which could not be fetched, so its items are not removed from the database.
+
+        Args:
+            crawl_url (str): The crawl URL which could not be fetched.
+            cached (Optional[CachedPage]): The state of the page on the previous cycle.
+
+        Returns:
+            Optional[RecordBatch]: The data of the previous cycle with a refreshed check time, or None without one.
+
+        """
+        # Without it the whole site is written without removals (e.g. on the first cycle after a restart)
+        if cached is None:
+            self._lost.add(crawl_url)
+            return None
+        return cached.data.with_check(self._get_article_time())
+
+    def collect(self, scraped_data: List[Optional[RecordBatch]]) -> RecordBatch:
+        """Combine the results of 'crawl' calls into a single RecordBatch.
+
+        If none of the pages changed since the previous cycle, an empty RecordBatch is returned so
+        the database update can be skipped.
+
+        Args:
+            scraped_data (List[Optional[RecordBatch]]): The results returned by 'crawl' for every crawl URL.
+
+        Returns:
+            RecordBatch: The scraped data as a RecordBatch.
+
+        """
+        # Site is failing if none of its URLs could be fetched
+        self._failed = len(scraped_data) > 0 and len(self._failures) == len(scraped_data)
+        self._partial = len(self._lost) > 0
+        self._unchanged = False
+
+        # Tell when the site breaks down or recovers
+        if self._health.update(len(scraped_data), len(self._failures), len(self._skipped), self._error):
+            print(f'{self.name} is {self._health.state}' + (f': {self._error}' if self._error else ''))
 
-            if new_data.empty:
-                print(f'Received an empty DataFrame: nothing were found')
-                continue
+        # Drop URLs which produced nothing (failed URLs carry the data of the previous cycle, if any)
+        scraped_data = [data for data in scraped_data if data is not None]
 
-            # Appending found data to 'scraped_data'
-            print(f'Scrape completed: found {len(new_data)} elements on the page')
-            scraped_data.append(new_data)
+        # Reset the flags for the next cycle
+        changed, self._changed = self._changed, False
+        self._failures, self._skipped, self._lost, self._error, self._deadline = set(), set(), set(), None, None
 
-        if len(scraped_data) == 0:
+        # Nothing is known about a site which could not be fetched at all, so its documents are left alone
+        if len(scraped_data) == 0 or self._failed:
             print(f'No data were scraped from {self.target_url}')
-            return DataFrame()
-        return concat(scraped_data, ignore_index=True)
+            return RecordBatch()
+
+        # Every page is unchanged, so there is nothing to update
+        if not changed:
+            print(f'Nothing has changed on {self.target_url} since the previous scrape')
+            self._unchanged = True
+            return RecordBatch()
+
+        # The same link may be found on several crawl URLs, keep its first occurrence
+        return RecordBatch.combine(scraped_data)
+
+    def start(self) -> RecordBatch:
+        """Scrape data from a web pages provided in 'crawl_urls' attribute.
+
+        Returns:
+            RecordBatch: The scraped data as a RecordBatch (use 'to_dataframe' to get a pandas DataFrame).
+
+        """
+        # Scrape through all URLs in the given list
+        return self.collect([self.crawl(crawl_url) for crawl_url in self.crawl_urls])
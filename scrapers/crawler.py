@@ -0,0 +1,111 @@
+from queue import Queue
+from collections import deque
+from urllib.parse import urlsplit
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.records import RecordBatch
+from scrapers.base_scraper import BaseScraper
+from config.helpers import get_max_workers, get_max_per_host
+
+
+class Crawler:
+    """Concurrent crawl engine.
+
+    Fetches every crawl URL of every given scraper on a shared thread pool, so a cycle takes roughly
+    as long as the slowest site instead of the sum of all sites. The number of simultaneous jobs is
+    limited globally by 'max_workers' and for each host by 'max_per_host'. Jobs wait for a slot of their host
+    before they are submitted, so a busy host never holds threads which other hosts could use.
+
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_per_host: Optional[int] = None):
+        """Initialize the Crawler object.
+
+        Args:
+            max_workers (Optional[int]): Global number of concurrent crawl jobs (MAX_WORKERS by default).
+            max_per_host (Optional[int]): Number of concurrent crawl jobs per host (MAX_PER_HOST by default).
+
+        """
+        self._max_workers = max_workers or get_max_workers()
+        self._max_per_host = max_per_host or get_max_per_host()
+
+        # Thread pool shared by all cycles
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='crawler')
+
+    @staticmethod
+    def _crawl(scraper: BaseScraper, crawl_url: str) -> Optional[RecordBatch]:
+        """Crawl a single URL of the scraper. """
+        try:
+            return scraper.crawl(crawl_url)
+        except Exception as error:
+            # A failing URL must not break the rest of the site
+            print(repr(error))
+            return None
+
+    def crawl(self, scrapers: List[BaseScraper]) -> Iterator[Tuple[BaseScraper, RecordBatch]]:
+        """Crawl all given scrapers concurrently.
+
+        Sites are yielded as soon as all of their crawl URLs are done, so the caller can update the
+        database and notify Slack for one site while the others are still being fetched.
+
+        Args:
+            scrapers (List[BaseScraper]): The scrapers to run.
+
+        Yields:
+            Tuple[BaseScraper, RecordBatch]: The scraper and the data scraped from all of its crawl URLs.
+
+        """
+        # Results of every crawl URL grouped by scraper (kept in 'crawl_urls' order)
+        results: Dict[int, List[Optional[RecordBatch]]] = {}
+        pending: Dict[int, int] = {}
+
+        # Jobs waiting for a slot of their host and the number of running jobs of every host
+        waiting: Dict[str, Deque[Tuple[BaseScraper, int]]] = {}
+        running: Dict[str, int] = {}
+
+        # Finished jobs are reported by the pool threads
+        finished: Queue = Queue()
+
+        def submit(host: str):
+            """Submit waiting jobs of the host while it has free slots. """
+            while waiting[host] and running[host] < self._max_per_host:
+                scraper, index = waiting[host].popleft()
+                running[host] += 1
+                future = self._executor.submit(self._crawl, scraper, scraper.crawl_urls[index])
+                future.add_done_callback(lambda done, job=(host, scraper, index): finished.put((job, done)))
+
+        for scraper in scrapers:
+            results[id(scraper)] = [None] * len(scraper.crawl_urls)
+            pending[id(scraper)] = len(scraper.crawl_urls)
+
+            for index, crawl_url in enumerate(scraper.crawl_urls):
+                host = urlsplit(crawl_url).netloc.lower()
+                waiting.setdefault(host, deque()).append((scraper, index))
+                running.setdefault(host, 0)
+
+        for host in waiting:
+            submit(host)
+
+        # Sites without URLs are done right away
+        for scraper in scrapers:
+            if pending[id(scraper)] == 0:
+                yield scraper, scraper.collect(results.pop(id(scraper)))
+
+        for _ in range(sum(pending.values())):
+            (host, scraper, index), future = finished.get()
+
+            # Hand the slot of the host to its next job
+            running[host] -= 1
+            submit(host)
+
+            results[id(scraper)][index] = future.result()
+            pending[id(scraper)] -= 1
+
+            # Every crawl URL of the site is done
+            if pending[id(scraper)] == 0:
+                yield scraper, scraper.collect(results.pop(id(scraper)))
+
+    def close(self):
+        """Shut down the thread pool."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
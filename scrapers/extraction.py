@@ -0,0 +1,93 @@
+from functools import lru_cache
+from re import compile, Pattern
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from bs4 import BeautifulSoup as BSoup, SoupStrainer, Tag
+
+from scrapers.parsers import SectionWatcher, class_strainer
+
+
+class ExtractionPlan:
+    """Precompiled settings for extracting links from pages of one site.
+
+    The plan is built once per distinct 'sections'/'element'/'filter' setup and shared by all scrapers
+    and cycles using it, so regular expressions and strainers are never compiled on the hot path.
+
+    """
+
+    __slots__ = ('sections', 'targets', 'compound', 'element', 'link_filter', 'strainer')
+
+    def __init__(self, sections: Tuple[str, ...], element: Optional[str], link_filter: str):
+        """Initialize the ExtractionPlan object.
+
+        Args:
+            sections (Tuple[str, ...]): The classes of the page sections to extract data from.
+            element (Optional[str]): The class of the elements to search for in sections.
+            link_filter (str): The regular expression pattern to match the link.
+
+        """
+        self.sections: Tuple[str, ...] = sections
+        self.targets: FrozenSet[str] = frozenset(sections)
+        # Sections of several classes, matched against the whole 'class' attribute like 'find(class_=...)' does
+        self.compound: FrozenSet[str] = frozenset(section for section in sections if len(section.split()) > 1)
+        self.element: Optional[str] = element
+        self.link_filter: Pattern = compile(link_filter)
+        self.strainer: SoupStrainer = class_strainer(sections)
+
+    def watcher(self) -> SectionWatcher:
+        """Create an incremental parser which tells when all sections of a page were downloaded.
+
+        Returns:
+            SectionWatcher: A new watcher for one page.
+
+        """
+        return SectionWatcher(self.targets)
+
+    def find_sections(self, web_page: BSoup) -> List[Tag]:
+        """Find the first tag of every section in a single traversal of the page.
+
+        Args:
+            web_page (BSoup): The BeautifulSoup object representing the web page.
+
+        Returns:
+            List[Tag]: The found section tags in the order of 'sections' (missing sections are skipped).
+
+        """
+        found: Dict[str, Tag] = {}
+
+        for tag in web_page.descendants:
+            # Only tags with classes may be sections
+            if not isinstance(tag, Tag) or 'class' not in tag.attrs:
+                continue
+
+            # Remember the first tag of every section class in document order
+            for cls in tag['class']:
+                if cls in self.targets and cls not in found:
+                    found[cls] = tag
+
+            if self.compound:
+                value = ' '.join(tag['class'])
+                if value in self.compound and value not in found:
+                    found[value] = tag
+
+            # Stop as soon as every section was found
+            if len(found) == len(self.targets):
+                break
+
+        return [found[section] for section in self.sections if section in found]
+
+
+@lru_cache(maxsize=1024)
+def get_plan(sections: Tuple[str, ...], element: Optional[str], link_filter: str) -> ExtractionPlan:
+    """Get the extraction plan for a setup, building it only the first time it is seen.
+
+    Args:
+        sections (Tuple[str, ...]): The classes of the page sections to extract data from.
+        element (Optional[str]): The class of the elements to search for in sections.
+        link_filter (str): The regular expression pattern to match the link.
+
+    Returns:
+        ExtractionPlan: The shared extraction plan.
+
+    """
+    return ExtractionPlan(sections, element, link_filter)
@@ -1,6 +1,13 @@
 from typing import List, Optional
 
+from utils.http import HttpClient
+from utils.archive import PageArchive
+from utils.page_cache import PageCache
+from utils.urls import UrlCanonicalizer
 from scrapers.base_link_scraper import BaseLinkScraper
+from scrapers.parsers import resolve_parser
+from scrapers.extraction import ExtractionPlan
+from scrapers.pool import ParsePool
 
 
 class ImplicitLinkScraper(BaseLinkScraper):
@@ -8,8 +15,16 @@ class ImplicitLinkScraper(BaseLinkScraper):
     def __init__(self, name: str,
                  target_url: str,
                  crawl_urls: List[str],
-                 sections: List[str], **kwargs):
-        super().__init__()
+                 sections: List[str],
+                 client: Optional[HttpClient] = None,
+                 cache: Optional[PageCache] = None,
+                 pool: Optional[ParsePool] = None,
+                 archive: Optional[PageArchive] = None,
+                 replay: bool = False, **kwargs):
+        super().__init__(client, cache, pool, archive, replay)
+
+        # Arguments which recreate the scraper in a parsing process
+        self._setup = dict(name=name, target_url=target_url, crawl_urls=crawl_urls, sections=sections, **kwargs)
 
         self._name = name
         self._target_url = target_url
@@ -18,11 +33,26 @@ class ImplicitLinkScraper(BaseLinkScraper):
 
         self._filter: Optional[str] = kwargs.get('filter', None)
         self._element: Optional[str] = kwargs.get('element', None)
+        self._parser: str = resolve_parser(kwargs.get('parser', None))
+        self._strainer: bool = kwargs.get('strainer', True)
+        self._early_stop: bool = kwargs.get('early_stop', False)
+        self._max_bytes: Optional[int] = kwargs.get('max_bytes', None)
+        self._strip_params: Optional[List[str]] = kwargs.get('strip_params', None)
+        self._time_budget: Optional[float] = kwargs.get('time_budget', None)
+
+        # Compile the extraction plan once (shared with other scrapers with the same setup)
+        self._plan: ExtractionPlan = super().plan
+        self._canonicalizer: UrlCanonicalizer = super().canonicalizer
+        self._cache_scope: str = super().cache_scope
 
     @property
     def name(self) -> str:
         return self._name
 
+    @property
+    def setup(self) -> dict:
+        return self._setup
+
     @property
     def target_url(self) -> str:
         return self._target_url
@@ -39,6 +69,46 @@ class ImplicitLinkScraper(BaseLinkScraper):
     def sections(self) -> List[str]:
         return self._sections
 
+    @property
+    def cache_scope(self) -> str:
+        return self._cache_scope
+
+    @property
+    def plan(self) -> ExtractionPlan:
+        return self._plan
+
+    @property
+    def time_budget(self) -> float:
+        if self._time_budget is not None:
+            return self._time_budget
+        return super().time_budget
+
+    @property
+    def strip_params(self) -> Optional[List[str]]:
+        return self._strip_params
+
+    @property
+    def canonicalizer(self) -> UrlCanonicalizer:
+        return self._canonicalizer
+
+    @property
+    def parser(self) -> str:
+        return self._parser
+
+    @property
+    def strainer(self) -> bool:
+        return self._strainer
+
+    @property
+    def early_stop(self) -> bool:
+        return self._early_stop
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return super().max_bytes
+
     @property
     def link_filter(self) -> str:
         if self._filter is not None:
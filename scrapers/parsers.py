@@ -0,0 +1,143 @@
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from bs4 import BeautifulSoup as BSoup, FeatureNotFound, SoupStrainer
+
+# Parser used when none is configured or the configured one is not installed
+DEFAULT_PARSER = 'html.parser'
+
+# Parsers which decode raw bytes themselves, given the encoding (others are given decoded text)
+BYTES_PARSERS = frozenset(('lxml', 'html5lib'))
+
+
+@lru_cache(maxsize=None)
+def resolve_parser(name: Optional[str]) -> str:
+    """Check that a BeautifulSoup tree builder is available.
+
+    Args:
+        name (Optional[str]): The name of the tree builder, e.g. 'html.parser' or 'lxml'.
+
+    Returns:
+        str: The given name, or DEFAULT_PARSER if it is not set or not installed.
+
+    """
+    if name is None or name == DEFAULT_PARSER:
+        return DEFAULT_PARSER
+
+    try:
+        # Building an empty document is enough to find the tree builder
+        BSoup('', name)
+        return name
+    except FeatureNotFound:
+        print(f'Parser \"{name}\" is not installed, falling back to \"{DEFAULT_PARSER}\"')
+        return DEFAULT_PARSER
+
+
+def matching_classes(targets: Iterable[str], classes: List[str]) -> Set[str]:
+    """Find the targets matched by the classes of a tag, the way 'find(class_=...)' matches them.
+
+    A target matches one of the classes, or the whole attribute (for targets of several classes).
+
+    Args:
+        targets (Iterable[str]): The classes searched for.
+        classes (List[str]): The classes of the tag.
+
+    Returns:
+        Set[str]: The matched targets.
+
+    """
+    found = {cls for cls in classes if cls in targets}
+    if len(classes) > 1 and ' '.join(classes) in targets:
+        found.add(' '.join(classes))
+    return found
+
+
+def _class_matcher(classes: Iterable[str]) -> Callable[[Optional[str]], bool]:
+    """Create a function matching a 'class' attribute which contains any of the given classes. """
+    targets = frozenset(classes)
+
+    def match(value) -> bool:
+        if value is None:
+            return False
+        # While parsing, the attribute may not be split into separate classes yet
+        values = value.split() if isinstance(value, str) else value
+        return bool(matching_classes(targets, values))
+
+    return match
+
+
+def class_strainer(classes: Iterable[str]) -> SoupStrainer:
+    """Create a SoupStrainer which keeps only the subtrees of tags with any of the given classes.
+
+    Args:
+        classes (Iterable[str]): The classes of the tags to keep.
+
+    Returns:
+        SoupStrainer: The strainer to pass as 'parse_only' to BeautifulSoup.
+
+    """
+    return SoupStrainer(attrs={'class': _class_matcher(classes)})
+
+
+class SectionWatcher(HTMLParser):
+    """Incremental parser which tells when the first tag of every section class was closed.
+
+    It is fed a page chunk by chunk while it is downloaded. Only the first tag of every section class is
+    ever extracted, so once all of them were closed the rest of the page is not needed. Chunks are decoded
+    as Latin-1, which keeps the markup of every ASCII-compatible encoding intact without decoding state.
+
+    """
+
+    def __init__(self, classes: Iterable[str]):
+        """Initialize the SectionWatcher object.
+
+        Args:
+            classes (Iterable[str]): The classes of the sections.
+
+        """
+        super().__init__(convert_charrefs=False)
+        self._pending: Set[str] = set(classes)
+
+        # Open section tags: their name, classes and depth of nested tags with the same name
+        self._open: List[Tuple[str, Set[str], List[int]]] = []
+
+        # Whether every section was closed
+        self.done = not self._pending
+
+    def handle_starttag(self, tag: str, attrs: list):
+        # Nested tags with the same name as an open section must be closed before the section
+        for name, _, depth in self._open:
+            if name == tag:
+                depth[0] += 1
+
+        for attr, value in attrs:
+            if attr == 'class' and value:
+                found = matching_classes(self._pending, value.split())
+                if found:
+                    self._pending -= found
+                    self._open.append((tag, found, [1]))
+
+    def handle_endtag(self, tag: str):
+        for section in list(self._open):
+            name, _, depth = section
+            if name == tag:
+                depth[0] -= 1
+                if depth[0] == 0:
+                    self._open.remove(section)
+
+        self.done = not self._pending and not self._open
+
+    def feed_chunk(self, chunk: bytes) -> bool:
+        """Parse the next chunk of the page.
+
+        Args:
+            chunk (bytes): The next part of the raw page.
+
+        Returns:
+            bool: True if every section was closed, so the rest of the page is not needed.
+
+        """
+        if not self.done:
+            self.feed(chunk.decode('latin-1'))
+        return self.done
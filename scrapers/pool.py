@@ -0,0 +1,118 @@
+import json
+from time import perf_counter
+from multiprocessing import get_all_start_methods, get_context
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+
+from utils.metrics import NullMetrics, set_metrics
+from config.helpers import get_parse_workers
+
+# Scrapers created in a worker process, by their setup
+_scrapers: Dict[str, object] = {}
+
+
+def _init_worker():
+    """Prepare a worker process: its metrics would never be exported, so they are disabled. """
+    set_metrics(NullMetrics())
+
+
+def _noop():
+    pass
+
+
+def _scrape(scraper_type: Type, setup: dict, markup: bytes, encoding: str) -> Tuple[List[List[str]], float, float]:
+    """Parse a page and extract its rows in a worker process.
+
+    Args:
+        scraper_type (Type): The class of the scraper.
+        setup (dict): The arguments the scraper is created with.
+        markup (bytes): The raw page to parse.
+        encoding (str): The encoding of the page.
+
+    Returns:
+        Tuple[List[List[str]], float, float]: The extracted [title, link] rows, parse and extract time in seconds.
+
+    """
+    # Scrapers (and their precompiled plans) are reused for all pages of a site
+    key = json.dumps(setup, sort_keys=True)
+    if key not in _scrapers:
+        _scrapers[key] = scraper_type(**setup)
+    scraper = _scrapers[key]
+
+    t0 = perf_counter()
+    web_page = scraper._parse(markup, encoding)
+    t1 = perf_counter()
+    data = scraper._scrape_page(web_page)
+    t2 = perf_counter()
+
+    # Only the compact rows travel back to the crawl process
+    return [[record.title, record.link] for record in data], t1 - t0, t2 - t1
+
+
+class ParsePool:
+    """Pool of processes which parse pages and extract rows.
+
+    Parsing and extraction are pure-Python CPU work which holds the GIL, so in the crawl threads they use a single
+    core. The pool runs them in 'workers' processes instead, so throughput scales with the number of cores.
+
+    Workers are forked once when the pool is created, so it must be created before any other thread is started.
+
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """Initialize the ParsePool object and start its processes.
+
+        Args:
+            workers (Optional[int]): The number of processes (PARSE_WORKERS by default).
+
+        """
+        self._workers = workers or get_parse_workers()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._workers, mp_context=get_context('fork'), initializer=_init_worker
+        )
+
+        # Start all processes now, while the process has no other threads
+        self._executor.submit(_noop).result()
+
+    @staticmethod
+    def create(workers: Optional[int] = None) -> Optional['ParsePool']:
+        """Create a pool if parsing in processes is enabled and supported.
+
+        Args:
+            workers (Optional[int]): The number of processes (PARSE_WORKERS by default).
+
+        Returns:
+            Optional[ParsePool]: The pool, or None if pages should be parsed in the crawl threads.
+
+        """
+        workers = workers or get_parse_workers()
+        if workers <= 0:
+            return None
+        if 'fork' not in get_all_start_methods():
+            print('Parsing in processes requires the fork start method, pages are parsed in the crawl threads')
+            return None
+        print(f'Parsing pages in {workers} processes')
+        return ParsePool(workers)
+
+    def scrape(self, scraper_type: Type, setup: dict,
+               markup: bytes, encoding: str) -> Tuple[List[List[str]], float, float]:
+        """Parse a page and extract its rows in one of the processes.
+
+        Args:
+            scraper_type (Type): The class of the scraper.
+            setup (dict): The arguments the scraper is created with.
+            markup (bytes): The raw page to parse.
+            encoding (str): The encoding of the page.
+
+        Returns:
+            Tuple[List[List[str]], float, float]: The extracted [title, link] rows, parse and extract time in seconds.
+
+        Raises:
+            BrokenProcessPool: If a worker process died.
+
+        """
+        return self._executor.submit(_scrape, scraper_type, setup, markup, encoding).result()
+
+    def close(self):
+        """Stop the processes."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
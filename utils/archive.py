@@ -0,0 +1,176 @@
+import os
+import json
+import zlib
+from mmap import mmap, ACCESS_READ
+from pathlib import Path
+from hashlib import blake2b
+from threading import Lock, get_ident
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+# Response headers kept in the archive (everything needed to decode and revalidate a page)
+ARCHIVED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class ArchivedPage:
+    """One recorded fetch of a URL: when it was fetched and which body it returned. """
+
+    __slots__ = ('url', 'time', 'digest', 'status', 'headers')
+
+    def __init__(self, url: str, time: str, digest: str, status: int, headers: Dict[str, str]):
+        self.url = url
+        self.time = time
+        self.digest = digest
+        self.status = status
+        self.headers = headers
+
+    def to_json(self) -> str:
+        return json.dumps({slot: getattr(self, slot) for slot in self.__slots__})
+
+
+class PageArchive:
+    """Compressed, content-addressed archive of fetched pages.
+
+    Bodies are stored once per distinct content in 'objects/<xx>/<digest>.z' (zlib-compressed, named after
+    the blake2b hash of the body), so a page which did not change between fetches costs no space.
+    Every fetch appends a line with its URL, time, status, headers and body digest to 'index.jsonl'.
+    Bodies are read through memory maps, so replaying thousands of pages does not copy files into buffers.
+
+    """
+
+    def __init__(self, directory: str | Path):
+        """Initialize the PageArchive object.
+
+        Args:
+            directory (str | Path): The directory of the archive (created if it does not exist).
+
+        """
+        self._directory = Path(directory)
+        self._objects = self._directory / 'objects'
+        self._index = self._directory / 'index.jsonl'
+        self._objects.mkdir(parents=True, exist_ok=True)
+
+        # Recorded fetches by URL in the order of their time (loaded on first use)
+        self._pages: Optional[Dict[str, List[ArchivedPage]]] = None
+        self._lock = Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / f'{digest}.z'
+
+    def _load_index(self) -> Dict[str, List[ArchivedPage]]:
+        """Read the index file once (must be called while holding the lock). """
+        if self._pages is None:
+            self._pages = {}
+            if self._index.exists():
+                with self._index.open('r', encoding='utf-8') as index:
+                    for line in index:
+                        if line.strip():
+                            page = ArchivedPage(**json.loads(line))
+                            self._pages.setdefault(page.url, []).append(page)
+        return self._pages
+
+    def record(self, url: str, response: Response):
+        """Store a fetched page.
+
+        Args:
+            url (str): The requested URL.
+            response (Response): The received response.
+
+        """
+        content = response.content
+        digest = blake2b(content, digest_size=16).hexdigest()
+
+        # Identical bodies are stored only once
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            temporary = path.with_suffix(f'.{os.getpid()}.{get_ident()}.tmp')
+            temporary.write_bytes(zlib.compress(content))
+            os.replace(temporary, path)
+
+        headers = {name: response.headers[name] for name in ARCHIVED_HEADERS if name in response.headers}
+        page = ArchivedPage(url, datetime.now(timezone.utc).isoformat(), digest, response.status_code, headers)
+
+        with self._lock:
+            self._load_index().setdefault(url, []).append(page)
+            with self._index.open('a', encoding='utf-8') as index:
+                index.write(page.to_json() + '\n')
+
+    def pages(self, url: Optional[str] = None) -> List[ArchivedPage]:
+        """Get the recorded fetches.
+
+        Args:
+            url (Optional[str]): Only fetches of this URL (all fetches if not given).
+
+        Returns:
+            List[ArchivedPage]: The recorded fetches, oldest first for every URL.
+
+        """
+        with self._lock:
+            pages = self._load_index()
+            if url is not None:
+                return list(pages.get(url, []))
+            return [page for fetches in pages.values() for page in fetches]
+
+    def read(self, page: ArchivedPage) -> bytes:
+        """Read the body of a recorded fetch.
+
+        Args:
+            page (ArchivedPage): The recorded fetch.
+
+        Returns:
+            bytes: The raw body.
+
+        """
+        with self._path(page.digest).open('rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as mapped:
+            return zlib.decompress(mapped)
+
+    def response(self, page: ArchivedPage) -> Response:
+        """Rebuild the response of a recorded fetch.
+
+        Args:
+            page (ArchivedPage): The recorded fetch.
+
+        Returns:
+            Response: The response as it was received.
+
+        """
+        response = Response()
+        response.url = page.url
+        response.status_code = page.status
+        response.headers = CaseInsensitiveDict(page.headers)
+        response._content = self.read(page)
+        return response
+
+    def replay(self, url: str, time: Optional[str] = None) -> Optional[Response]:
+        """Get the latest recorded response of a URL.
+
+        Args:
+            url (str): The requested URL.
+            time (Optional[str]): Only fetches at or before this ISO time (the latest fetch if not given).
+
+        Returns:
+            Optional[Response]: The recorded response, or None if the URL was never recorded.
+
+        """
+        pages = [page for page in self.pages(url) if time is None or page.time <= time]
+        if not pages:
+            return None
+        return self.response(pages[-1])
+
+    def iter_responses(self, urls: Optional[List[str]] = None) -> Iterator[Response]:
+        """Iterate over all recorded responses.
+
+        Args:
+            urls (Optional[List[str]]): Only responses of these URLs (all responses if not given).
+
+        Yields:
+            Response: The recorded responses, oldest first for every URL.
+
+        """
+        for page in self.pages():
+            if urls is None or page.url in urls:
+                yield self.response(page)
@@ -0,0 +1,183 @@
+from time import monotonic
+from threading import Lock
+from typing import Dict, Optional
+
+from config.helpers import get_breaker_threshold, get_breaker_cooldown, get_max_interval
+
+
+class CircuitBreaker:
+    """Failure memory of one host.
+
+    After 'threshold' consecutive failures the circuit opens and requests to the host are refused without
+    touching the network. After a cooldown a single trial request is let through: if it succeeds the circuit
+    closes, otherwise it opens again for twice as long (up to 'max_cooldown').
+
+    """
+
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float):
+        """Initialize the CircuitBreaker object.
+
+        Args:
+            threshold (int): Number of consecutive failures which opens the circuit.
+            cooldown (float): Seconds the circuit stays open the first time.
+            max_cooldown (float): Maximal seconds the circuit stays open.
+
+        """
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._lock = Lock()
+
+        # Consecutive failures, number of times the circuit opened in a row and the time it may be tried again
+        self._failures = 0
+        self._opened = 0
+        self._retry_at: Optional[float] = None
+
+        # Whether a trial request is running while the circuit is open
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests to the host are currently refused. """
+        with self._lock:
+            return self._retry_at is not None and (monotonic() < self._retry_at or self._probing)
+
+    @property
+    def remaining(self) -> float:
+        """Seconds until the host may be tried again (0 if the circuit is closed). """
+        with self._lock:
+            return max(self._retry_at - monotonic(), 0.0) if self._retry_at is not None else 0.0
+
+    def allow(self) -> bool:
+        """Check whether a request to the host may be sent.
+
+        Returns:
+            bool: True if the circuit is closed, or if this request is the trial after the cooldown.
+
+        """
+        with self._lock:
+            if self._retry_at is None:
+                return True
+            if monotonic() < self._retry_at or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def success(self):
+        """Record a successful request, closing the circuit. """
+        with self._lock:
+            self._failures, self._opened, self._retry_at, self._probing = 0, 0, None, False
+
+    def release(self):
+        """Record a request which ended without telling whether the host works (e.g. it ran out of time). """
+        with self._lock:
+            self._probing = False
+
+    def failure(self, retry_after: Optional[float] = None):
+        """Record a failed request, opening the circuit after too many of them.
+
+        Args:
+            retry_after (Optional[float]): Seconds the host asked us to wait (e.g. from a 'Retry-After' header).
+
+        """
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures < self._threshold and self._retry_at is None and retry_after is None:
+                return
+
+            # Back off exponentially while the host keeps failing, but never less than it asked for
+            self._opened += 1
+            cooldown = min(self._cooldown * 2 ** (self._opened - 1), self._max_cooldown)
+            self._retry_at = monotonic() + max(cooldown, retry_after or 0.0)
+
+
+class HostBreakers:
+    """Circuit breakers of all hosts, created on first use. """
+
+    def __init__(self,
+                 threshold: Optional[int] = None,
+                 cooldown: Optional[float] = None,
+                 max_cooldown: Optional[float] = None):
+        """Initialize the HostBreakers object.
+
+        Args:
+            threshold (Optional[int]): Consecutive failures which open a circuit (BREAKER_THRESHOLD by default).
+            cooldown (Optional[float]): Seconds a circuit stays open the first time (BREAKER_COOLDOWN by default).
+            max_cooldown (Optional[float]): Maximal seconds a circuit stays open (MAX_INTERVAL by default).
+
+        """
+        self._threshold = threshold or get_breaker_threshold()
+        self._cooldown = cooldown or get_breaker_cooldown()
+        self._max_cooldown = max_cooldown or get_max_interval()
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        """Get the circuit breaker of a host.
+
+        Args:
+            host (str): The host name (with port, if any).
+
+        Returns:
+            CircuitBreaker: The breaker of the host.
+
+        """
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self._threshold, self._cooldown, self._max_cooldown)
+            return self._breakers[host]
+
+
+class SiteHealth:
+    """Health of one website after its last scrape. """
+
+    # The website could be fetched completely
+    HEALTHY = 'healthy'
+    # Some crawl URLs could not be fetched
+    DEGRADED = 'degraded'
+    # No crawl URL could be fetched
+    FAILING = 'failing'
+    # Every crawl URL was skipped without a request because its host is cooling down
+    OPEN = 'open'
+
+    __slots__ = ('state', 'failures', 'error')
+
+    def __init__(self):
+        self.state = SiteHealth.HEALTHY
+        # Number of consecutive scrapes in which no crawl URL could be fetched
+        self.failures = 0
+        # Description of the last error
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the website could be fetched completely. """
+        return self.state == SiteHealth.HEALTHY
+
+    def update(self, urls: int, failed: int, skipped: int, error: Optional[str]) -> bool:
+        """Update the health from the results of a scrape.
+
+        Args:
+            urls (int): The number of crawl URLs.
+            failed (int): The number of crawl URLs which could not be fetched.
+            skipped (int): The number of failed crawl URLs skipped without a request.
+            error (Optional[str]): Description of the last error.
+
+        Returns:
+            bool: Whether the state has changed.
+
+        """
+        previous = self.state
+        if failed == 0:
+            self.state, self.failures, self.error = SiteHealth.HEALTHY, 0, None
+            return self.state != previous
+
+        if failed < urls:
+            self.state = SiteHealth.DEGRADED
+        else:
+            self.state = SiteHealth.OPEN if skipped == urls else SiteHealth.FAILING
+            self.failures += 1
+        self.error = error
+        return self.state != previous
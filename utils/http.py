@@ -0,0 +1,329 @@
+from codecs import getincrementaldecoder, lookup
+from time import monotonic
+from socket import SHUT_RDWR
+from threading import Event, Lock, Timer
+from urllib.parse import urlsplit
+from re import compile, IGNORECASE, Pattern
+from typing import Callable, Dict, Optional, Tuple
+
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+
+from utils.breaker import CircuitBreaker, HostBreakers
+from config.helpers import get_http_timeouts, get_http_retries, get_http_backoff, get_max_per_host
+
+# Charset declared in a 'Content-Type' header or in a <meta> tag of a page
+_HEADER_CHARSET: Pattern = compile(r'charset\s*=\s*["\']?([\w.:-]+)', IGNORECASE)
+_META_CHARSET: Pattern = compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', IGNORECASE)
+
+# Number of bytes at the start of a page searched for a <meta> charset
+META_SEARCH_BYTES = 8192
+
+
+class CircuitOpen(RequestException):
+    """The host failed too often and is not requested until its cooldown ends. """
+
+
+class DeadlineExceeded(RequestException):
+    """The time budget of the request ran out. """
+
+
+class HttpClient:
+    """Long-lived HTTP client shared by all scrapers.
+
+    Wraps a single 'requests' session whose connections are pooled per host and kept alive between
+    cycles, so DNS, TCP and TLS setup is paid once per host instead of once per request.
+    Every request has connect/read timeouts and failed requests are retried with exponential backoff.
+    Hosts which keep failing are not requested at all for a while (see 'HostBreakers'), so a dead website costs
+    no time per cycle.
+
+    """
+
+    # Retry only on responses which are likely to succeed later
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # Number of hosts which keep their connection pools alive
+    POOL_HOSTS = 128
+
+    # Number of bytes read from a response body at once
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self,
+                 timeouts: Optional[Tuple[float, float]] = None,
+                 retries: Optional[int] = None,
+                 backoff: Optional[float] = None,
+                 pool_size: Optional[int] = None,
+                 breakers: Optional[HostBreakers] = None):
+        """Initialize the HttpClient object.
+
+        Args:
+            timeouts (Optional[Tuple[float, float]]): Connect and read timeouts in seconds.
+            retries (Optional[int]): Number of retries of a failed request.
+            backoff (Optional[float]): Backoff factor between retries in seconds.
+            pool_size (Optional[int]): Number of connections kept alive per host.
+            breakers (Optional[HostBreakers]): Circuit breakers of the hosts (created from the settings if not given).
+
+        """
+        self._timeouts = timeouts or get_http_timeouts()
+
+        # Failure memory of every host
+        self._breakers = breakers or HostBreakers()
+
+        # Retry connection errors and retryable statuses ('Retry-After' opens the circuit instead of blocking a thread)
+        retry = Retry(
+            total=get_http_retries() if retries is None else retries,
+            backoff_factor=get_http_backoff() if backoff is None else backoff,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+
+        # Pool connections per host
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_HOSTS,
+            pool_maxsize=pool_size or get_max_per_host(),
+            max_retries=retry
+        )
+
+        # Create a session object with a custom User-Agent header, asking for compressed bodies (brotli if installed)
+        self._session = Session()
+        self._session.headers.update({'User-Agent': 'Mozilla/5.0', 'Accept-Encoding': ACCEPT_ENCODING})
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def get(self, url: str,
+            headers: Optional[Dict[str, str]] = None,
+            max_bytes: Optional[int] = None,
+            stop: Optional[Callable[[bytes], bool]] = None,
+            deadline: Optional[float] = None) -> Response:
+        """Send a GET request to the specified URL.
+
+        The body is read in chunks: reading ends after 'max_bytes' bytes, or as soon as 'stop' tells that
+        the rest of the page is not needed. The connection is then closed instead of downloading the rest.
+
+        Args:
+            url (str): The URL to request.
+            headers (Optional[Dict[str, str]]): Additional request headers.
+            max_bytes (Optional[int]): The maximal number of bytes read from the body (unlimited if not given).
+            stop (Optional[Callable[[bytes], bool]]): Function fed with every chunk, returns True to stop reading.
+            deadline (Optional[float]): The 'time.monotonic' time by which the whole body must be read.
+
+        Returns:
+            Response: The received response with the part of the body which was read.
+
+        Raises:
+            CircuitOpen: If the host is cooling down after too many failures (nothing is sent).
+            DeadlineExceeded: If the deadline passed before the body was read.
+            RequestException: If the request failed after all retries or timed out.
+
+        """
+        # Running out of the budget of the site says nothing about the host
+        if deadline is not None and deadline <= monotonic():
+            raise DeadlineExceeded(f'No time left to request {url}')
+
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpen(f'Host of {url} is failing, not requested for {breaker.remaining:.1f} more seconds')
+
+        try:
+            response = self._read(url, headers, max_bytes, stop, deadline)
+        except DeadlineExceeded:
+            breaker.release()
+            raise
+        except RequestException:
+            breaker.failure()
+            raise
+
+        # Overloaded or broken hosts are failing as well, and may tell how long to wait
+        if response.status_code in self.RETRY_STATUSES:
+            breaker.failure(retry_after(response))
+        else:
+            breaker.success()
+        return response
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Get the circuit breaker of the host of a URL.
+
+        Args:
+            url (str): The URL.
+
+        Returns:
+            CircuitBreaker: The breaker of its host.
+
+        """
+        return self._breakers.get(urlsplit(url).netloc.lower())
+
+    def _read(self, url: str,
+              headers: Optional[Dict[str, str]],
+              max_bytes: Optional[int],
+              stop: Optional[Callable[[bytes], bool]],
+              deadline: Optional[float]) -> Response:
+        """Send the request and read its body (see 'get'). """
+        # Never wait for the host longer than the remaining budget
+        timeouts = self._timeouts
+        if deadline is not None:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f'No time left to request {url}')
+            timeouts = (min(timeouts[0], remaining), min(timeouts[1], remaining))
+
+        response = self._session.get(url, headers=headers, timeout=timeouts, stream=True)
+
+        # A host trickling the body never hits the read timeout, so its connection is cut when the time runs out
+        expired, watchdog = Event(), None
+        if deadline is not None:
+            watchdog = Timer(max(deadline - monotonic(), 0.0), _cut, (response, expired))
+            watchdog.daemon = True
+            watchdog.start()
+
+        chunks, size = [], 0
+        try:
+            for chunk in response.iter_content(self.CHUNK_SIZE):
+                # Cut the body at the size limit
+                if max_bytes is not None and size + len(chunk) > max_bytes:
+                    chunks.append(chunk[:max_bytes - size])
+                    print(f'Page {url} is larger than {max_bytes} bytes, the rest is not read')
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+
+                # Everything needed from the page was read
+                if stop is not None and stop(chunk):
+                    break
+        except RequestException:
+            if expired.is_set():
+                raise DeadlineExceeded(f'Time ran out after reading {size} bytes of {url}')
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+            # A fully read body has returned its connection to the pool, an unfinished one cannot be reused
+            response.close()
+
+        # The body may also end silently when its connection was cut
+        if expired.is_set():
+            raise DeadlineExceeded(f'Time ran out after reading {size} bytes of {url}')
+
+        # The body is served from memory from now on
+        response._content = b''.join(chunks)
+        return response
+
+    def close(self):
+        """Close all pooled connections."""
+        self._session.close()
+
+
+def _cut(response: Response, expired: Event):
+    """Shut down the connection of a response which is still being read, waking up the reading thread. """
+    expired.set()
+
+    # The socket is held by the 'http.client' response under the urllib3 one
+    sock = getattr(getattr(getattr(getattr(response.raw, '_fp', None), 'fp', None), 'raw', None), '_sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(SHUT_RDWR)
+        except OSError:
+            # The connection was closed in the meantime
+            pass
+
+
+def _codec(name: bytes | str) -> Optional[str]:
+    """Get the canonical name of a codec, or None if Python does not know it. """
+    try:
+        return lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def declared_encoding(response: Response) -> Optional[str]:
+    """Get the encoding a page declares, without looking at the text itself.
+
+    The charset of the 'Content-Type' header wins, otherwise a <meta> tag at the start of the page is used.
+
+    Args:
+        response (Response): The response of the page.
+
+    Returns:
+        Optional[str]: The canonical codec name, or None if the page declares no known encoding.
+
+    """
+    match = _HEADER_CHARSET.search(response.headers.get('Content-Type', ''))
+    if match is not None and (encoding := _codec(match.group(1))) is not None:
+        return encoding
+
+    match = _META_CHARSET.search(response.content, 0, META_SEARCH_BYTES)
+    if match is not None:
+        return _codec(match.group(1))
+    return None
+
+
+def retry_after(response: Response) -> Optional[float]:
+    """Get the number of seconds a host asked to wait in the 'Retry-After' header.
+
+    Args:
+        response (Response): The response of the host.
+
+    Returns:
+        Optional[float]: The number of seconds, or None if the header is missing or holds a date.
+
+    """
+    value = response.headers.get('Retry-After', '').strip()
+    return float(value) if value.isdigit() else None
+
+
+def is_utf8(content: bytes) -> bool:
+    """Check whether a page is valid UTF-8 (pure ASCII included).
+
+    A multi-byte character cut at the end of the body (e.g. by MAX_PAGE_BYTES) is not counted as an error.
+
+    Args:
+        content (bytes): The raw page.
+
+    Returns:
+        bool: True if the page decodes as UTF-8.
+
+    """
+    try:
+        getincrementaldecoder('utf-8')().decode(content, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff_encoding(response: Response) -> str:
+    """Guess the encoding of a page from its text (slow, the whole body is analysed).
+
+    Args:
+        response (Response): The response of the page.
+
+    Returns:
+        str: The canonical codec name ('utf-8' if nothing could be guessed).
+
+    """
+    encoding = _codec(response.apparent_encoding or 'utf-8') or 'utf-8'
+
+    # A page without non-ASCII characters tells nothing, and other pages of the site may well have them
+    return 'utf-8' if encoding == 'ascii' else encoding
+
+
+# Client used by scrapers which were not given one explicitly
+_default_client: Optional[HttpClient] = None
+_default_client_lock = Lock()
+
+
+def get_default_client() -> HttpClient:
+    """Get the process-wide HTTP client, creating it on first use.
+
+    Returns:
+        HttpClient: The shared HTTP client.
+
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,181 @@
+from math import ceil
+from time import monotonic
+from threading import Event, Lock, Thread
+from typing import Iterable, Optional, Set
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from config.helpers import get_worker_id, get_lease_ttl
+
+
+class LeaseManager:
+    """Shares websites between several workers through leases stored in MongoDB.
+
+    Every worker announces itself in the 'workers' collection and claims up to its fair share of websites
+    in the 'leases' collection. A lease belongs to one worker until it expires, so each website is scraped
+    by exactly one worker. Leases and announcements expire after 'ttl' seconds unless renewed (and are
+    removed by TTL indexes), so the websites of a worker which left are taken over by the others, and
+    workers give up websites above their share when a new worker joins. Leases are also renewed from a
+    background thread, so a cycle which takes longer than 'ttl' does not lose them.
+
+    """
+
+    # Collections holding the leases and the live workers
+    LEASES = 'leases'
+    WORKERS = 'workers'
+
+    def __init__(self, database: Database, worker_id: Optional[str] = None, ttl: Optional[int] = None):
+        """Initialize the LeaseManager object.
+
+        Args:
+            database (Database): The database the leases are stored in.
+            worker_id (Optional[str]): The unique name of this worker (WORKER_ID by default).
+            ttl (Optional[int]): The lifetime of leases in seconds (LEASE_TTL by default).
+
+        """
+        self._leases = database[self.LEASES]
+        self._workers = database[self.WORKERS]
+        self._worker_id = worker_id or get_worker_id()
+        self._ttl = timedelta(seconds=ttl or get_lease_ttl())
+
+        # Websites owned after the last claim and the 'time.monotonic' time until which the leases surely hold
+        self._owned: Set[str] = set()
+        self._valid_until = 0.0
+        self._lock = Lock()
+
+        # Thread renewing the leases between claims (started by the first claim)
+        self._stop = Event()
+        self._renewer: Optional[Thread] = None
+
+        # Let the server remove expired leases and workers
+        for collection in (self._leases, self._workers):
+            collection.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+
+        print(f'Worker {self._worker_id} shares websites through leases')
+
+    @property
+    def worker_id(self) -> str:
+        """The unique name of this worker. """
+        return self._worker_id
+
+    def holds(self, site: str) -> bool:
+        """Check whether this worker still owns a website, without asking the database.
+
+        Args:
+            site (str): The name of the website.
+
+        Returns:
+            bool: True if the website was claimed and its lease was renewed less than 'ttl' seconds ago.
+
+        """
+        with self._lock:
+            return site in self._owned and monotonic() < self._valid_until
+
+    def renew(self):
+        """Extend the leases of this worker and its announcement without claiming or releasing websites. """
+        started = monotonic()
+        expires_at = datetime.now(timezone.utc) + self._ttl
+        self._workers.update_one({'_id': self._worker_id}, {'$set': {'expires_at': expires_at}}, upsert=True)
+        self._leases.update_many({'owner': self._worker_id}, {'$set': {'expires_at': expires_at}})
+
+        with self._lock:
+            self._valid_until = started + self._ttl.total_seconds()
+
+    def _renew_forever(self):
+        """Renew the leases every third of 'ttl' until 'release' is called. """
+        while not self._stop.wait(self._ttl.total_seconds() / 3):
+            try:
+                self.renew()
+            except Exception as error:
+                # The next claim or renewal tries again
+                print(f'{error!r} occurred while renewing the leases of {self._worker_id}')
+
+    def _claim(self, site: str, now: datetime, expires_at: datetime) -> bool:
+        """Claim a website which has no valid lease (or renew own lease).
+
+        Args:
+            site (str): The name of the website.
+            now (datetime): The current time.
+            expires_at (datetime): The expiration time of the lease.
+
+        Returns:
+            bool: True if this worker owns the website.
+
+        """
+        try:
+            # Matches only a free, expired or own lease; otherwise the upsert collides with the existing lease
+            self._leases.find_one_and_update(
+                {'_id': site, '$or': [{'expires_at': {'$lt': now}}, {'owner': self._worker_id}]},
+                {'$set': {'owner': self._worker_id, 'expires_at': expires_at}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def claim(self, sites: Iterable[str]) -> Set[str]:
+        """Renew the leases of this worker and claim or release websites to match its fair share.
+
+        Must be called more often than every 'ttl' seconds.
+
+        Args:
+            sites (Iterable[str]): The names of all websites.
+
+        Returns:
+            Set[str]: The names of the websites this worker owns.
+
+        """
+        sites = set(sites)
+        started = monotonic()
+        now = datetime.now(timezone.utc)
+        expires_at = now + self._ttl
+
+        # Announce this worker and count the live ones
+        self._workers.update_one({'_id': self._worker_id}, {'$set': {'expires_at': expires_at}}, upsert=True)
+        workers = self._workers.count_documents({'expires_at': {'$gte': now}})
+        share = ceil(len(sites) / max(workers, 1))
+
+        # Renew own leases and find out which websites are owned
+        self._leases.update_many(
+            {'owner': self._worker_id, '_id': {'$in': list(sites)}}, {'$set': {'expires_at': expires_at}}
+        )
+        owned = {lease['_id'] for lease in self._leases.find({'owner': self._worker_id}, {'_id': 1})}
+
+        # Leases of websites removed from the setup or above the fair share are given back
+        released = owned - sites
+        released |= set(sorted(owned & sites)[share:])
+        if released:
+            self._leases.delete_many({'owner': self._worker_id, '_id': {'$in': list(released)}})
+            owned -= released
+
+        # Claim free websites until the fair share is reached
+        for site in sorted(sites - owned):
+            if len(owned) >= share:
+                break
+            if self._claim(site, now, expires_at):
+                owned.add(site)
+
+        with self._lock:
+            self._owned, self._valid_until = set(owned), started + self._ttl.total_seconds()
+
+        # Keep the leases alive while the crawl runs
+        if self._renewer is None:
+            self._renewer = Thread(target=self._renew_forever, name='leases', daemon=True)
+            self._renewer.start()
+
+        return owned
+
+    def release(self):
+        """Give back all leases of this worker, so the other workers take over its websites."""
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+
+        with self._lock:
+            self._owned = set()
+        self._leases.delete_many({'owner': self._worker_id})
+        self._workers.delete_one({'_id': self._worker_id})
+        print(f'Worker {self._worker_id} released its websites')
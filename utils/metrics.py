@@ -0,0 +1,252 @@
+import os
+import json
+from bisect import bisect_left
+from threading import Lock, Thread
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from time import perf_counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from config.helpers import get_metrics_file, get_metrics_port
+
+# Upper bounds of the latency histogram buckets (in seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prefix of all exported metric names
+PREFIX = 'scraper'
+
+# Context manager returned by disabled timers
+_NULL_TIMER = nullcontext()
+
+
+class _Histogram:
+    """Latency histogram of one stage of one site. """
+
+    __slots__ = ('buckets', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Per-site timings and counters of the pipeline stages.
+
+    Stages ('fetch', 'parse', 'extract', 'update', 'slack') are recorded as latency histograms and
+    events (bytes downloaded, rows extracted, database round trips, errors) as counters. Totals are exported
+    in the Prometheus text format to a file and/or an HTTP endpoint, and every 'flush' prints a JSON summary
+    of the cycle which has just ended.
+
+    """
+
+    def __init__(self, path: Optional[str] = None, port: Optional[int] = None):
+        """Initialize the Metrics object.
+
+        Args:
+            path (Optional[str]): File the Prometheus text is written to on every flush.
+            port (Optional[int]): Port of the HTTP endpoint serving the Prometheus text.
+
+        """
+        self._path = path
+        self._lock = Lock()
+
+        # Totals since start and values of the current cycle
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._cycle_histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._cycle_counters: Dict[Tuple[str, str], float] = {}
+
+        if port is not None:
+            self._serve(port)
+
+    def observe(self, stage: str, site: str, seconds: float):
+        """Record the duration of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            site (str): The name of the website.
+            seconds (float): The duration in seconds.
+
+        """
+        key = (stage, site)
+        with self._lock:
+            for histograms in (self._histograms, self._cycle_histograms):
+                if key not in histograms:
+                    histograms[key] = _Histogram()
+                histograms[key].observe(seconds)
+
+    @contextmanager
+    def _timer(self, stage: str, site: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, site, perf_counter() - start)
+
+    def timer(self, stage: str, site: str) -> ContextManager:
+        """Measure the duration of a 'with' block as a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            site (str): The name of the website.
+
+        Returns:
+            ContextManager: The timing context manager.
+
+        """
+        return self._timer(stage, site)
+
+    def inc(self, counter: str, site: str, value: float = 1):
+        """Increase a counter.
+
+        Args:
+            counter (str): The name of the counter.
+            site (str): The name of the website.
+            value (float): The increment.
+
+        """
+        key = (counter, site)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._cycle_counters[key] = self._cycle_counters.get(key, 0) + value
+
+    def render(self) -> str:
+        """Render all totals in the Prometheus text format.
+
+        Returns:
+            str: The Prometheus text exposition.
+
+        """
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {PREFIX}_stage_seconds histogram')
+            for (stage, site), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{_escape(stage)}",site="{_escape(site)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.buckets):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{{labels}}} {histogram.count}')
+
+            for counter in sorted({counter for counter, _ in self._counters}):
+                lines.append(f'# TYPE {PREFIX}_{counter}_total counter')
+                for (name, site), value in sorted(self._counters.items()):
+                    if name == counter:
+                        lines.append(f'{PREFIX}_{counter}_total{{site="{_escape(site)}"}} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> dict:
+        """Get the summary of the current cycle and start a new one.
+
+        Returns:
+            dict: Stage timings and counters of the cycle per site.
+
+        """
+        sites: Dict[str, dict] = {}
+        with self._lock:
+            for (stage, site), histogram in self._cycle_histograms.items():
+                stages = sites.setdefault(site, {'stages': {}, 'counters': {}})['stages']
+                stages[stage] = {'count': histogram.count, 'sum_s': histogram.sum, 'max_s': histogram.max}
+            for (counter, site), value in self._cycle_counters.items():
+                sites.setdefault(site, {'stages': {}, 'counters': {}})['counters'][counter] = value
+
+            self._cycle_histograms, self._cycle_counters = {}, {}
+
+        return {'cycle_end': datetime.now(timezone.utc).isoformat(), 'sites': sites}
+
+    def flush(self):
+        """End the current cycle: print its JSON summary and write the Prometheus file."""
+        print(json.dumps(self.summary()))
+
+        if self._path is not None:
+            # Replace the file at once so readers never see a partial export
+            temporary = f'{self._path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                file.write(self.render())
+            os.replace(temporary, self._path)
+
+    def _serve(self, port: int):
+        """Serve the Prometheus text over HTTP from a background thread. """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+        Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        print(f'Serving metrics on port {port}')
+
+
+class NullMetrics:
+    """Metrics which record nothing, used when no export is configured. """
+
+    def observe(self, stage: str, site: str, seconds: float):
+        pass
+
+    def timer(self, stage: str, site: str) -> ContextManager:
+        return _NULL_TIMER
+
+    def inc(self, counter: str, site: str, value: float = 1):
+        pass
+
+    def flush(self):
+        pass
+
+
+# Metrics of the process
+_metrics: Optional[Metrics | NullMetrics] = None
+_metrics_lock = Lock()
+
+
+def get_metrics() -> Metrics | NullMetrics:
+    """Get the metrics of the process, creating them on first use.
+
+    Metrics are enabled when METRICS_FILE or METRICS_PORT is set, otherwise every call is a no-op.
+
+    Returns:
+        Metrics | NullMetrics: The metrics of the process.
+
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                path, port = get_metrics_file(), get_metrics_port()
+                _metrics = Metrics(path, port) if path is not None or port is not None else NullMetrics()
+    return _metrics
+
+
+def set_metrics(metrics: Metrics | NullMetrics):
+    """Replace the metrics of the process, e.g. to disable them in worker processes.
+
+    Args:
+        metrics (Metrics | NullMetrics): The metrics to use.
+
+    """
+    global _metrics
+    with _metrics_lock:
+        _metrics = metrics
@@ -1,29 +1,114 @@
-from typing import Optional
-from pandas import DataFrame
-from pymongo import MongoClient
+from time import monotonic
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateMany, UpdateOne
 from pymongo.database import Database
-
+from pymongo.collection import Collection
+from pymongo.change_stream import CollectionChangeStream
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from utils.metrics import get_metrics
+from utils.records import Record, RecordBatch
+from utils.urls import link_key
+from utils.snapshot import SnapshotStore
 from config.helpers import get_mongo_url, get_mongo_database, get_mongo_setup
+from config.helpers import get_snapshot_dir, get_check_refresh_interval, get_check_ttl, get_max_interval
 
 
 class MongoData:
     Title = 'title'
     Link = 'link'
+    Key = 'key'
     Check = 'check'
     Creation = 'creation'
 
 
+def format_message(documents: List[List[str]]) -> str:
+    """Format inserted documents as a Slack message.
+
+    Args:
+        documents (List[List[str]]): The [title, link] of every inserted document.
+
+    Returns:
+        str: One line per document, or an empty string if nothing was inserted.
+
+    """
+    return ''.join([f'\"{el[0]}\": {el[1]}\n' for el in documents])
+
+
 class MongoDataBase:
-    def __init__(self):
-        """Initialize the MongoDataBase class."""
+    # Maximum number of operations sent in one bulk write
+    BULK_BATCH_SIZE = 1000
+
+    # Fields of the setup file which mark its revision instead of describing a website
+    SETUP_VERSION_FIELDS = ('version', 'updated_at')
+
+    # Name of the index which expires documents not seen for CHECK_TTL seconds
+    TTL_INDEX = 'check_ttl'
+
+    # CHECK_TTL must be this many times the longest time a 'check' may stay unrefreshed on a working website
+    TTL_MARGIN = 2
+
+    # Format of the timestamps stored by older versions
+    STRING_TIME_FORMAT = '%Y-%m-%d UTC %H:%M'
+
+    def __init__(self, cluster: Optional[MongoClient] = None, snapshots: Optional[SnapshotStore] = None):
+        """Initialize the MongoDataBase class.
+
+        Args:
+            cluster (Optional[MongoClient]): An already connected client (MONGO_URL is connected to if not given).
+            snapshots (Optional[SnapshotStore]): Titles of the previous cycle (persisted to SNAPSHOT_DIR if not given).
+
+        Raises:
+            Exception: If CHECK_TTL would expire documents of websites which are still scraped.
+
+        """
+        # Refuse a lifetime which lets documents expire between two refreshes of their check time
+        self._validate_ttl()
+
         # List to store information about inserted documents
         self._documents: list = []
 
+        # Names of collections which already have their indexes
+        self._indexed: Set[str] = set()
+
+        # Titles of the previous cycle of every collection
+        self._snapshots: SnapshotStore = snapshots or SnapshotStore(get_snapshot_dir())
+
+        # Time of the last 'check' refresh of every collection
+        self._refreshed: Dict[str, float] = {}
+
+        # Cached setup file, its revision and the change stream watching it
+        self._setup: Optional[dict] = None
+        self._setup_version: Optional[tuple] = None
+        self._setup_stream: Optional[CollectionChangeStream] = None
+
         # MongoDB cluster connection object
-        self._cluster: Optional[MongoClient] = None
+        self._cluster: Optional[MongoClient] = cluster
 
         # Establish a connection to the MongoDB cluster upon initialization
-        self._connect()
+        if self._cluster is None:
+            self._connect()
+
+    @staticmethod
+    def _validate_ttl():
+        """Make sure CHECK_TTL is well above the time a 'check' may stay unrefreshed.
+
+        A website is scraped at least every MAX_INTERVAL seconds and its unchanged documents are refreshed at most
+        every CHECK_REFRESH_INTERVAL seconds, so a 'check' may be that much older without the item being gone.
+
+        Raises:
+            Exception: If CHECK_TTL is set below TTL_MARGIN times the sum of both intervals.
+
+        """
+        ttl = get_check_ttl()
+        if ttl is None:
+            return
+
+        minimum = MongoDataBase.TTL_MARGIN * (get_max_interval() + get_check_refresh_interval())
+        if ttl < minimum:
+            raise Exception(f'CHECK_TTL of {ttl} seconds would expire documents which are still on their websites, '
+                            f'it must be at least {minimum} seconds (MAX_INTERVAL + CHECK_REFRESH_INTERVAL, twice)')
 
     def _connect(self):
         """Connect to the MongoDB cluster."""
@@ -43,55 +128,334 @@ class MongoDataBase:
             self._cluster = None
             print(repr(e))
 
-    def update(self, data: DataFrame, collection_name: str):
+    def update(self, data: RecordBatch, collection_name: str):
         """Update the collection with the provided data.
 
         Args:
-            data (DataFrame): The data to update the collection with.
+            data (RecordBatch): The data to update the collection with.
             collection_name (str): The name of the collection to update.
 
         Raises:
             Exception: If no MongoDB cluster connection was established.
 
+        """
+        # Clear list of updated documents and remember the new ones
+        self._documents = []
+        self._documents = self.write(data, collection_name)
+
+    def write(self, data: RecordBatch, collection_name: str, partial: bool = False) -> List[List[str]]:
+        """Update the collection with the provided data without keeping any state for 'message'.
+
+        Args:
+            data (RecordBatch): The data to update the collection with.
+            collection_name (str): The name of the collection to update.
+            partial (bool): Whether the items of some pages are missing, so no document is removed.
+
+        Returns:
+            List[List[str]]: The [title, link] of every inserted document.
+
+        Raises:
+            Exception: If no MongoDB cluster connection was established.
+
         """
         if self._cluster is None:
             raise Exception('No MongoDB cluster connection was established')
 
-        # Clear list of updated documents
-        self._documents = []
-
         # If no data were given then exit without updating
         if data.empty:
-            return
+            return []
+
+        # Synchronize the collection, timing the whole stage
+        with get_metrics().timer('update', collection_name):
+            return self._sync(data, collection_name, partial)
+
+    def _sync(self, data: RecordBatch, collection_name: str, partial: bool = False) -> List[List[str]]:
+        """Delete items which are gone, insert new ones and refresh the check time of the others.
+
+        Gone items are deleted first, so their links are free again for new titles (unordered bulk writes run
+        updates before deletes). The other writes are sent together in one unordered bulk write (split every
+        BULK_BATCH_SIZE).
+
+        Args:
+            data (RecordBatch): The data to update the collection with.
+            collection_name (str): The name of the collection to update.
+            partial (bool): Whether the items of some pages are missing, so no document is removed.
+
+        Returns:
+            List[List[str]]: The [title, link] of every inserted document.
+
+        """
+        metrics = get_metrics()
 
         # Get the 'collection_name' collection within database
         collection = self.database[collection_name]
+        self.ensure_indexes([collection_name])
 
-        # Delete documents from the collection where the 'Title' field is not in the provided data
+        # Compare the scraped items with the previous cycle
         print(f'Updating collection {collection_name}...')
-        query = {MongoData.Title: {'$nin': data[MongoData.Title].to_list()}}
-        for itm_to_delete in collection.find(query):
-            collection.delete_one(itm_to_delete)
-
-        # Iterate over the data DataFrame
-        for r, title in enumerate(data[MongoData.Title]):
-            # Find and update a document in the collection based on the 'Title' field
-            if collection.find_one_and_update(
-                    {MongoData.Title: title},
-                    {'$set': {MongoData.Check: data[MongoData.Check][r]}}
-            ) is None:
-                # If the document doesn't exist, insert a new document into the collection
-                collection.insert_one(dict(zip(data.columns, data.values[r])))
-                # Append a new document to the list
-                self._documents.append([data[MongoData.Title][r], data[MongoData.Link][r]])
-
-        # Return the message containing information about inserted documents
-        print(f'Update completed: inserted {len(self._documents)} new documents')
+        diff = self._snapshots.diff(self._previous(collection), data)
+
+        # Delete documents whose titles are no longer on the website (a renamed article keeps its link)
+        if diff.removed and not partial:
+            collection.delete_many({MongoData.Title: {'$in': list(diff.removed)}})
+            metrics.inc('db_round_trips', collection_name)
+
+        # Insert new documents (upserts leave documents written meanwhile by someone else as they are)
+        records = diff.added
+        requests: list = [UpdateOne(
+            {MongoData.Title: record.title},
+            {
+                '$set': {MongoData.Check: record.check},
+                '$setOnInsert': {
+                    MongoData.Link: record.link,
+                    MongoData.Key: link_key(record.link),
+                    MongoData.Creation: record.creation
+                }
+            },
+            upsert=True
+        ) for record in records]
+
+        # Refresh the check time of unchanged documents (every document is new and fresh if there are none)
+        if diff.unchanged:
+            request = self._refresh_request(collection_name, max(record.check for record in diff.unchanged))
+            if request is not None:
+                requests.append(request)
+        else:
+            self._refreshed[collection_name] = monotonic()
+
+        documents, failed = [], set()
+        for start in range(0, len(requests), self.BULK_BATCH_SIZE):
+            # Indexes of inserted documents and of failed writes within the batch
+            upserted, errors = self._bulk_write(collection, requests[start:start + self.BULK_BATCH_SIZE])
+            metrics.inc('db_round_trips', collection_name)
+
+            # Append new documents to the list
+            for index in sorted(upserted):
+                record = records[start + index]
+                documents.append([record.title, record.link])
+
+            # New titles which were not written are tried again on the next cycle
+            failed.update(records[start + index].title for index in errors if start + index < len(records))
+
+        # The collection now mirrors this cycle (with the titles which were kept because pages were missing)
+        titles = {record.title for record in data} - failed
+        self._snapshots.put(collection_name, titles | diff.removed if partial else titles)
+
+        print(f'Update completed: inserted {len(documents)} new documents')
+        metrics.inc('documents_inserted', collection_name, len(documents))
+        return documents
+
+    def refresh(self, collection_name: str, check: datetime):
+        """Refresh the check time of a collection whose website was scraped but has not changed.
 
-    @property
-    def setup_file(self) -> dict:
-        """This property retrieves the setup file from the MongoDB database, which contains information
-        about the scraped websites.
+        Args:
+            collection_name (str): The name of the collection.
+            check (datetime): The time the website was scraped.
+
+        Raises:
+            Exception: If no MongoDB cluster connection was established.
+
+        """
+        if self._cluster is None:
+            raise Exception('No MongoDB cluster connection was established')
+
+        request = self._refresh_request(collection_name, check)
+        if request is not None:
+            self.database[collection_name].bulk_write([request])
+            get_metrics().inc('db_round_trips', collection_name)
+
+    def _refresh_request(self, collection_name: str, check: datetime) -> Optional[UpdateMany]:
+        """Create the write refreshing the check time of a collection, at most once per CHECK_REFRESH_INTERVAL.
+
+        Args:
+            collection_name (str): The name of the collection.
+            check (datetime): The new check time.
+
+        Returns:
+            Optional[UpdateMany]: The write, or None if the collection was refreshed recently.
+
+        """
+        refreshed = self._refreshed.get(collection_name)
+        if refreshed is not None and monotonic() - refreshed < get_check_refresh_interval():
+            return None
+        self._refreshed[collection_name] = monotonic()
+        return UpdateMany({MongoData.Check: {'$lt': check}}, {'$set': {MongoData.Check: check}})
+
+    def _previous(self, collection: Collection) -> Set[str]:
+        """Get the titles of the previous cycle, reading them from the collection if there is no snapshot.
+
+        Args:
+            collection (Collection): The collection.
+
+        Returns:
+            Set[str]: The titles stored in the collection.
+
+        """
+        # Documents may have expired since their check time was last refreshed (or since the worker started)
+        ttl, refreshed = get_check_ttl(), self._refreshed.get(collection.name)
+        if ttl is not None and (refreshed is None or monotonic() - refreshed >= ttl):
+            self._snapshots.forget(collection.name)
+
+        previous = self._snapshots.get(collection.name)
+        if previous is None:
+            # Load only the titles
+            cursor = collection.find({}, {MongoData.Title: 1, '_id': 0})
+            get_metrics().inc('db_round_trips', collection.name)
+            previous = {document[MongoData.Title] for document in cursor}
+            self._snapshots.put(collection.name, previous)
+        return previous
+
+    def forget(self, collection_names: Iterable[str]):
+        """Drop the snapshots of collections which may be written by someone else from now on.
+
+        Args:
+            collection_names (Iterable[str]): The names of the collections.
+
+        """
+        for collection_name in collection_names:
+            self._snapshots.forget(collection_name)
+            self._refreshed.pop(collection_name, None)
+
+    @staticmethod
+    def _bulk_write(collection: Collection, requests: list) -> Tuple[Iterable[int], Iterable[int]]:
+        """Send a batch of writes to the collection in one unordered bulk write.
+
+        Args:
+            collection (Collection): The collection to write to.
+            requests (list): The write operations to send.
+
+        Returns:
+            Tuple[Iterable[int], Iterable[int]]: The indexes of the requests which inserted a new document
+                and of the requests which failed.
+
+        """
+        try:
+            return collection.bulk_write(requests, ordered=False).upserted_ids.keys(), []
+        except BulkWriteError as error:
+            # The rest of the batch is still applied, e.g. when a link is already stored under another title
+            errors = error.details['writeErrors']
+            print(f'{len(errors)} documents were not written to {collection.name}')
+            get_metrics().inc('db_errors', collection.name, len(errors))
+            upserted = [upserted['index'] for upserted in error.details['upserted']]
+            return upserted, [write_error['index'] for write_error in errors]
+
+    def ensure_indexes(self, collection_names: Iterable[str]):
+        """Make sure the indexes of the given collections exist.
+
+        Every collection gets unique indexes on 'title' and on the hashed link 'key' (sparse, documents stored
+        before links had keys are left out), compound indexes for the latest items by 'check' and 'creation',
+        and a TTL index on 'check' if CHECK_TTL is set (a TTL index left from an earlier CHECK_TTL is dropped).
+
+        Args:
+            collection_names (Iterable[str]): The names of the collections.
+
+        Raises:
+            Exception: If no MongoDB cluster connection was established.
+
+        """
+        if self._cluster is None:
+            raise Exception('No MongoDB cluster connection was established')
+
+        ttl = get_check_ttl()
+        for collection_name in collection_names:
+            if collection_name in self._indexed:
+                continue
+
+            collection = self.database[collection_name]
+            for field, sparse in [(MongoData.Title, False), (MongoData.Key, True)]:
+                try:
+                    # Does nothing if the index already exists
+                    collection.create_index([(field, ASCENDING)], unique=True, sparse=sparse)
+                except OperationFailure as error:
+                    # E.g. the collection already holds duplicates
+                    print(f'Could not create unique index on {collection_name}.{field}: {error!r}')
+
+            # Items still on the website newest first, and the newest items ever found
+            collection.create_index([(MongoData.Check, DESCENDING), (MongoData.Creation, DESCENDING)])
+            collection.create_index([(MongoData.Creation, DESCENDING)])
+
+            if ttl is not None:
+                self._ensure_ttl(collection, ttl)
+            else:
+                self._drop_ttl(collection)
+
+            self._indexed.add(collection_name)
+
+    def _ensure_ttl(self, collection: Collection, ttl: int):
+        """Let the server delete documents whose 'check' is older than 'ttl' seconds.
+
+        Args:
+            collection (Collection): The collection.
+            ttl (int): The lifetime of a document after its last check in seconds.
+
+        """
+        try:
+            collection.create_index([(MongoData.Check, ASCENDING)], expireAfterSeconds=ttl, name=self.TTL_INDEX)
+        except OperationFailure:
+            # The index exists with another lifetime
+            self.database.command('collMod', collection.name, index={'name': self.TTL_INDEX, 'expireAfterSeconds': ttl})
+
+    def _drop_ttl(self, collection: Collection):
+        """Stop the server from deleting documents of a collection, if CHECK_TTL was set before.
+
+        Args:
+            collection (Collection): The collection.
+
+        """
+        if self.TTL_INDEX in collection.index_information():
+            collection.drop_index(self.TTL_INDEX)
+            print(f'CHECK_TTL is not set, documents of {collection.name} no longer expire')
+
+    def migrate_timestamps(self, collection_name: str, utc_offset: timedelta) -> int:
+        """Convert the 'creation' and 'check' strings of old documents into UTC dates.
+
+        Older versions stored local times as strings like 'YYYY-MM-DD UTC HH:MM' (despite the label).
+        Documents with strings in another format are left as they are and reported.
+
+        Args:
+            collection_name (str): The name of the collection.
+            utc_offset (timedelta): The UTC offset of the clock the strings were written with.
+
+        Returns:
+            int: The number of converted documents.
+
+        """
+        metrics = get_metrics()
+        collection = self.database[collection_name]
+        zone = timezone(utc_offset)
+
+        def convert(value):
+            if not isinstance(value, str):
+                return value
+            return datetime.strptime(value, self.STRING_TIME_FORMAT).replace(tzinfo=zone).astimezone(timezone.utc)
+
+        cursor = collection.find(
+            {'$or': [{field: {'$type': 'string'}} for field in (MongoData.Creation, MongoData.Check)]},
+            {MongoData.Creation: 1, MongoData.Check: 1}
+        )
+        requests, malformed = [], []
+        for document in cursor:
+            try:
+                times = {field: convert(document.get(field)) for field in (MongoData.Creation, MongoData.Check)}
+            except ValueError:
+                # One broken document must not stop the migration of the others
+                malformed.append(document['_id'])
+                continue
+            requests.append(UpdateOne({'_id': document['_id']}, {'$set': times}))
+
+        for start in range(0, len(requests), self.BULK_BATCH_SIZE):
+            collection.bulk_write(requests[start:start + self.BULK_BATCH_SIZE], ordered=False)
+            metrics.inc('db_round_trips', collection_name)
+
+        print(f'Converted timestamps of {len(requests)} documents in {collection_name}')
+        if malformed:
+            print(f'Skipped {len(malformed)} documents of {collection_name} with malformed timestamps: '
+                  f'{", ".join(str(document_id) for document_id in malformed[:10])}'
+                  + (' ...' if len(malformed) > 10 else ''))
+        return len(requests)
+
+    def _read_setup(self) -> dict:
+        """Read the setup file from the MongoDB database.
 
         Note: 'find_one' is generally considered to be less costly compared to operations like 'find' or 'aggregate' that
         return multiple documents. The performance of the `find_one` operation can vary depending on factors such as the
@@ -103,13 +467,92 @@ class MongoDataBase:
             Dict: Setup file which contains information about scraped websites.
 
         """
-        if self.database is not None:
-            print('Reading setup file from MongoDB...')
-            setup = self.database[get_mongo_setup()].find_one()
-            del setup['_id']  # Delete unnecessary key
-            print(f'Found {len(setup)} websites to scrape')
-            return setup
-        return {}
+        print('Reading setup file from MongoDB...')
+        setup = self.database[get_mongo_setup()].find_one() or {}
+
+        # Keep the revision apart from the websites
+        self._setup_version = tuple(setup.get(field) for field in self.SETUP_VERSION_FIELDS)
+        setup = {key: value for key, value in setup.items()
+                 if key != '_id' and key not in self.SETUP_VERSION_FIELDS}
+
+        print(f'Found {len(setup)} websites to scrape')
+        return setup
+
+    def _watch_setup(self) -> Optional[CollectionChangeStream]:
+        """Open a change stream on the setup collection.
+
+        Returns:
+            Optional[CollectionChangeStream]: The change stream, or None if the cluster does not support them.
+
+        """
+        try:
+            return self.database[get_mongo_setup()].watch()
+        except PyMongoError:
+            # Change streams require a replica set
+            print('Change streams are not available, polling the setup file for changes')
+            return None
+
+    def refresh_setup(self) -> bool:
+        """Check whether the setup file changed and reload it if so.
+
+        Changes are taken from a change stream when the cluster supports them. Otherwise the 'version'/'updated_at'
+        fields of the setup file are polled, and if it has neither, the whole file is read and compared.
+
+        Returns:
+            bool: True if the setup file was (re)loaded.
+
+        """
+        if self.database is None:
+            return False
+
+        # First call: load the setup file and start watching it
+        if self._setup is None:
+            self._setup_stream = self._watch_setup()
+            self._setup = self._read_setup()
+            return True
+
+        if self._setup_stream is not None:
+            try:
+                # Drain pending events without blocking
+                changed = False
+                while self._setup_stream.try_next() is not None:
+                    changed = True
+                if not changed:
+                    return False
+            except PyMongoError as error:
+                print(repr(error))
+                self._setup_stream = self._watch_setup()
+        else:
+            # Poll only the revision fields when the setup file has them
+            version = self.database[get_mongo_setup()].find_one(
+                {}, {field: 1 for field in self.SETUP_VERSION_FIELDS}
+            ) or {}
+            version = tuple(version.get(field) for field in self.SETUP_VERSION_FIELDS)
+            if any(field is not None for field in version) and version == self._setup_version:
+                return False
+
+        setup = self._read_setup()
+        if setup == self._setup:
+            return False
+
+        self._setup = setup
+        print('Setup file has changed')
+        return True
+
+    @property
+    def setup_file(self) -> dict:
+        """This property retrieves the setup file, which contains information about the scraped websites.
+
+        The setup file is read from the MongoDB database only once and then cached,
+        use 'refresh_setup' to pick up changes.
+
+        Returns:
+            Dict: Setup file which contains information about scraped websites.
+
+        """
+        if self._setup is None:
+            self.refresh_setup()
+        return self._setup if self._setup is not None else {}
 
     @property
     def database(self) -> Optional[Database]:
@@ -123,6 +566,16 @@ class MongoDataBase:
             return self._cluster[get_mongo_database()]
         return None
 
+    @property
+    def inserted(self) -> int:
+        """Get the number of documents inserted by the last update.
+
+        Returns:
+            int: The number of inserted documents.
+
+        """
+        return len(self._documents)
+
     @property
     def message(self) -> str:
         """Get the message containing information about inserted documents.
@@ -131,32 +584,31 @@ class MongoDataBase:
             str: The message containing information about inserted documents.
 
         """
-        if len(self._documents) != 0:
-            return ''.join([f'\"{el[0]}\": {el[1]}\n' for el in self._documents])
-        return ''
+        return format_message(self._documents)
 
     def close(self):
         """Close the connection to the MongoDB cluster."""
+        if self._setup_stream is not None:
+            self._setup_stream.close()
         if self._cluster is not None:
             self._cluster.close()
 
 
 if __name__ == '__main__':
-    # Create an empty DataFrame
-    df = DataFrame()
-
-    # Populate the DataFrame with test data
-    df[MongoData.Title] = ['Test title 1', 'Test title 2', 'Test title 4']
-    df[MongoData.Link] = ['www.nothing.xx', 'https:/www.nothing2.xx', 'www.nothing3.xxxx']
-    df[MongoData.Check] = ['12:59', '12:29', '12:29']
-    df[MongoData.Creation] = ['12:29', '12:29', '12:29']
+    # Create a batch with test data
+    now = datetime.now(timezone.utc)
+    data = RecordBatch([
+        Record('Test title 1', 'www.nothing.xx', now - timedelta(minutes=30), now),
+        Record('Test title 2', 'https:/www.nothing2.xx', now - timedelta(minutes=30), now - timedelta(minutes=30)),
+        Record('Test title 4', 'www.nothing3.xxxx', now - timedelta(minutes=30), now - timedelta(minutes=30))
+    ])
 
     try:
         # Establish a connection to the MongoDB cluster
         cluster = MongoDataBase()
 
         # Update the MongoDB database with the scraped data and retrieve the message
-        cluster.update(data=df, collection_name='Test')
+        cluster.update(data=data, collection_name='Test')
 
         # Print the result of the 'update' function with the test data
         print(cluster.message)
@@ -0,0 +1,141 @@
+from re import compile, DOTALL, IGNORECASE
+from hashlib import blake2b
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from requests import Response
+
+from utils.records import RecordBatch
+
+# Parts of a page which change on every request without changing its content
+_VOLATILE = compile(rb'<(script|style|noscript)\b.*?</\1\s*>', DOTALL | IGNORECASE)
+
+
+class CachedPage:
+    """Validators, content digest and scraped data remembered for one crawl URL. """
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'data')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: str, data: RecordBatch):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.data = data
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Conditional request headers for the next GET of the page. """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """Remembers what every crawl URL looked like on the previous cycle.
+
+    The cache holds 'ETag'/'Last-Modified' validators for conditional GET requests and a digest of the
+    page body without scripts and styles. A '304 Not Modified' response or an identical digest is a hit:
+    the page does not have to be parsed again and its previously scraped data can be reused.
+    Pages are kept per scope (the setup of the scraper), so data is never reused under other extraction settings.
+
+    """
+
+    def __init__(self):
+        """Initialize the PageCache object."""
+        self._pages: Dict[Tuple[str, str], CachedPage] = {}
+        self._lock = Lock()
+
+        # Counters of the current cycle
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        """Hash the relevant bytes of a page body.
+
+        Args:
+            content (bytes): The raw page body.
+
+        Returns:
+            str: The hex digest of the body without scripts and styles.
+
+        """
+        return blake2b(_VOLATILE.sub(b'', content), digest_size=16).hexdigest()
+
+    def get(self, url: str, scope: str = '') -> Optional[CachedPage]:
+        """Get the cached state of a crawl URL.
+
+        Args:
+            url (str): The crawl URL.
+            scope (str): The scope of the scraper (see 'BaseScraper.cache_scope').
+
+        Returns:
+            Optional[CachedPage]: The cached state, or None if the URL was not scraped yet in this scope.
+
+        """
+        with self._lock:
+            return self._pages.get((scope, url))
+
+    def put(self, url: str, response: Response, digest: str, data: RecordBatch, scope: str = ''):
+        """Remember the state of a freshly scraped crawl URL.
+
+        Args:
+            url (str): The crawl URL.
+            response (Response): The response the data was scraped from.
+            digest (str): The digest of the response body.
+            data (RecordBatch): The data scraped from the page.
+            scope (str): The scope of the scraper (see 'BaseScraper.cache_scope').
+
+        """
+        page = CachedPage(response.headers.get('ETag'), response.headers.get('Last-Modified'), digest, data)
+        with self._lock:
+            self._pages[(scope, url)] = page
+
+    def forget(self, scope: str):
+        """Drop all pages of a scope, e.g. when the scraper was rebuilt with another setup.
+
+        Args:
+            scope (str): The scope of the scraper.
+
+        """
+        with self._lock:
+            for key in [key for key in self._pages if key[0] == scope]:
+                del self._pages[key]
+
+    def hit(self):
+        """Count a page which did not change. """
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        """Count a page which had to be scraped. """
+        with self._lock:
+            self.misses += 1
+
+    def report(self):
+        """Print the counters of the current cycle and reset them."""
+        with self._lock:
+            print(f'Page cache: {self.hits} unchanged pages skipped, {self.misses} pages scraped')
+            self.hits, self.misses = 0, 0
+
+
+# Cache used by scrapers which were not given one explicitly
+_default_cache: Optional[PageCache] = None
+_default_cache_lock = Lock()
+
+
+def get_default_cache() -> PageCache:
+    """Get the process-wide page cache, creating it on first use.
+
+    Returns:
+        PageCache: The shared page cache.
+
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache()
+        return _default_cache
@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Set
+
+from utils.urls import link_key
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Fields of a record, in the order of the columns of 'to_dataframe' (they match the MongoData field names)
+FIELDS = ('title', 'link', 'creation', 'check')
+
+
+class Record:
+    """One scraped item: its title, link and the times it was first and last seen. """
+
+    __slots__ = FIELDS
+
+    def __init__(self, title: str, link: str, creation: datetime, check: datetime):
+        self.title = title
+        self.link = link
+        self.creation = creation
+        self.check = check
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Record) and all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self) -> str:
+        return f'Record(title={self.title!r}, link={self.link!r}, creation={self.creation!r}, check={self.check!r})'
+
+
+class RecordBatch:
+    """Records scraped from pages of one website.
+
+    A plain list of slotted records, so the pipeline does not need pandas. Use 'to_dataframe' to analyse
+    the records with pandas, which is imported only then.
+
+    """
+
+    __slots__ = ('_records',)
+
+    def __init__(self, records: Iterable[Record] = ()):
+        """Initialize the RecordBatch object.
+
+        Args:
+            records (Iterable[Record]): The records of the batch.
+
+        """
+        self._records: List[Record] = list(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self._records)
+
+    @property
+    def empty(self) -> bool:
+        """Whether the batch holds no records. """
+        return len(self._records) == 0
+
+    def column(self, field: str) -> List[Any]:
+        """Get one field of all records.
+
+        Args:
+            field (str): The name of the field, e.g. MongoData.Title.
+
+        Returns:
+            List[Any]: The values in the order of the records.
+
+        """
+        return [getattr(record, field) for record in self._records]
+
+    def with_check(self, check: datetime) -> 'RecordBatch':
+        """Copy the batch with a new check time.
+
+        Args:
+            check (datetime): The new check time of every record.
+
+        Returns:
+            RecordBatch: The copy of the batch.
+
+        """
+        return RecordBatch(Record(record.title, record.link, record.creation, check) for record in self._records)
+
+    @staticmethod
+    def combine(batches: Iterable['RecordBatch']) -> 'RecordBatch':
+        """Combine batches, keeping the first record of every link (compared by its 'link_key').
+
+        Args:
+            batches (Iterable[RecordBatch]): The batches to combine.
+
+        Returns:
+            RecordBatch: The combined batch.
+
+        """
+        records: List[Record] = []
+        keys: Set[bytes] = set()
+        for batch in batches:
+            for record in batch:
+                key = link_key(record.link)
+                if key not in keys:
+                    keys.add(key)
+                    records.append(record)
+        return RecordBatch(records)
+
+    def to_dataframe(self) -> 'DataFrame':
+        """Convert the batch to a pandas DataFrame.
+
+        Returns:
+            DataFrame: One row per record with the columns 'title', 'link', 'creation' and 'check'.
+
+        """
+        from pandas import DataFrame
+        return DataFrame([[getattr(record, field) for field in FIELDS] for record in self._records],
+                         columns=list(FIELDS))
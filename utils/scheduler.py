@@ -0,0 +1,160 @@
+from time import monotonic
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.helpers import get_time_interval, get_min_interval, get_max_interval
+
+
+class SiteState:
+    """Scheduling state of one website. """
+
+    __slots__ = ('interval', 'rate', 'due', 'scraped', 'failures')
+
+    def __init__(self, interval: float, due: float):
+        # Current interval between scrapes in seconds
+        self.interval = interval
+        # Smoothed number of new items per second
+        self.rate: Optional[float] = None
+        # Time of the next scrape
+        self.due = due
+        # Time of the last successful scrape
+        self.scraped: Optional[float] = None
+        # Number of consecutive failed scrapes
+        self.failures = 0
+
+
+class Scheduler:
+    """Adaptive per-site scheduler.
+
+    Websites are kept in a priority queue ordered by the time of their next scrape. After each scrape
+    the interval of the site is adjusted from its observed rate of new items: busy sites are polled
+    more often and quiet ones less often, failing sites back off exponentially. Intervals always stay
+    within 'min_interval' and 'max_interval'.
+
+    """
+
+    # Weight of the latest observation in the smoothed rate
+    SMOOTHING = 0.3
+
+    # Expected number of new items per scrape the interval is tuned for
+    TARGET_ITEMS = 1.0
+
+    # Growth of the interval of a site which has not published anything yet
+    QUIET_BACKOFF = 1.5
+
+    def __init__(self,
+                 interval: Optional[float] = None,
+                 min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None):
+        """Initialize the Scheduler object.
+
+        Args:
+            interval (Optional[float]): Initial interval of new sites in seconds (TIME_INTERVAL by default).
+            min_interval (Optional[float]): Minimal interval in seconds (MIN_INTERVAL by default).
+            max_interval (Optional[float]): Maximal interval in seconds (MAX_INTERVAL by default).
+
+        """
+        self._min_interval = min_interval or get_min_interval()
+        self._max_interval = max_interval or get_max_interval()
+        self._interval = self._clamp(interval or get_time_interval())
+
+        # Priority queue of (due time, site name), outdated entries are skipped when popped
+        self._queue: List[Tuple[float, str]] = []
+        self._sites: Dict[str, SiteState] = {}
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self._min_interval), self._max_interval)
+
+    def _push(self, name: str, due: float):
+        self._sites[name].due = due
+        heappush(self._queue, (due, name))
+
+    def sync(self, names: Iterable[str]):
+        """Make the scheduled sites match the given ones.
+
+        New sites are due immediately, sites which are not given any more are dropped.
+
+        Args:
+            names (Iterable[str]): The names of all websites to scrape.
+
+        """
+        names = set(names)
+        for name in list(self._sites):
+            if name not in names:
+                del self._sites[name]
+
+        now = monotonic()
+        for name in names:
+            if name not in self._sites:
+                self._sites[name] = SiteState(self._interval, now)
+                self._push(name, now)
+
+    def due(self) -> List[str]:
+        """Pop all sites which are due to be scraped.
+
+        Returns:
+            List[str]: The names of the due sites, most overdue first.
+
+        """
+        now, names = monotonic(), []
+        while self._queue and self._queue[0][0] <= now:
+            due, name = heappop(self._queue)
+            # Skip removed sites and entries replaced by a later reschedule
+            state = self._sites.get(name)
+            if state is not None and state.due == due:
+                names.append(name)
+        return names
+
+    def report(self, name: str, inserted: int, failed: bool = False):
+        """Reschedule a site after it was scraped.
+
+        Args:
+            name (str): The name of the website.
+            inserted (int): The number of new items found on the website.
+            failed (bool): Whether the website could not be fetched.
+
+        """
+        state = self._sites.get(name)
+        if state is None:
+            return
+
+        now = monotonic()
+        if failed:
+            # Back off exponentially while the site keeps failing
+            state.failures += 1
+            state.interval = self._clamp(state.interval * 2)
+        else:
+            if state.scraped is not None:
+                # Update the smoothed rate of new items
+                rate = inserted / max(now - state.scraped, 1.0)
+                state.rate = rate if state.rate is None \
+                    else self.SMOOTHING * rate + (1 - self.SMOOTHING) * state.rate
+
+                # Poll often enough to find about TARGET_ITEMS new items per scrape
+                state.interval = self._clamp(self.TARGET_ITEMS / state.rate) if state.rate > 0 \
+                    else self._clamp(state.interval * self.QUIET_BACKOFF)
+
+            state.failures = 0
+            state.scraped = now
+
+        self._push(name, now + state.interval)
+        print(f'Next scrape of {name} in {state.interval:.0f} seconds')
+
+    def wait_time(self) -> float:
+        """Get the time until the next site is due.
+
+        Returns:
+            float: The number of seconds to sleep (0 if a site is already due).
+
+        """
+        # Drop entries of removed or rescheduled sites
+        while self._queue:
+            due, name = self._queue[0]
+            state = self._sites.get(name)
+            if state is not None and state.due == due:
+                break
+            heappop(self._queue)
+
+        if not self._queue:
+            return self._interval
+        return max(self._queue[0][0] - monotonic(), 0.0)
@@ -1,7 +1,91 @@
+from time import sleep, monotonic
+from threading import Lock, Thread
+from queue import Empty, Full, Queue
+from typing import List, Optional
+
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
-from config.helpers import get_slack_token, get_slack_channel
+from utils.metrics import get_metrics
+from config.helpers import get_slack_token, get_slack_channel, get_slack_window, get_slack_queue_size
+
+# Maximal length of one Slack message (longer texts are split)
+MAX_MESSAGE_LENGTH = 4000
+
+# Number of attempts to post a message which is rate limited
+MAX_ATTEMPTS = 5
+
+# Client shared by all messages
+_client: Optional[WebClient] = None
+_client_lock = Lock()
+
+
+def _get_client() -> WebClient:
+    """Get the persistent Slack client, creating it on first use. """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Create a WebClient instance using the Slack token
+            _client = WebClient(token=get_slack_token())
+        return _client
+
+
+def split_message(message: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split a message into parts which fit into a single Slack message.
+
+    Messages are split at line boundaries, only lines longer than 'limit' are cut.
+
+    Args:
+        message (str): The message to split.
+        limit (int): The maximal length of a part.
+
+    Returns:
+        List[str]: The parts of the message.
+
+    """
+    parts, current = [], ''
+    for line in message.splitlines(keepends=True):
+        # Cut lines which do not fit even into an empty part
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:limit])
+            line = line[limit:]
+
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ''
+        current += line
+
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _post(channel: str, message: str):
+    """Post a message to the channel, waiting out rate limits.
+
+    Args:
+        channel (str): The Slack channel.
+        message (str): The message to post.
+
+    Raises:
+        SlackApiError: If the message could not be posted.
+
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            # Send a message to the specified channel
+            _get_client().chat_postMessage(channel=channel, text=message)
+            return
+        except SlackApiError as e:
+            # Only rate limited requests are retried, after the time Slack asks for
+            if e.response.status_code != 429 or attempt == MAX_ATTEMPTS:
+                raise
+            delay = int(e.response.headers.get('Retry-After', 1))
+            print(f'Slack rate limit reached, retrying in {delay} seconds')
+            sleep(delay)
 
 
 def message_to_slack(message: str):
@@ -9,20 +93,109 @@ def message_to_slack(message: str):
     if message == '':
         return
 
-    try:
-        # Retrieve the Slack token
-        token = get_slack_token()
+    metrics = get_metrics()
 
+    try:
         # Retrieve the Slack channel
         channel = get_slack_channel()
 
-        # Create a WebClient instance using the Slack token
-        client = WebClient(token=token)
-
-        # Send a message to the specified channel
-        client.chat_postMessage(channel=channel, text=message)
+        # Send the message in parts which fit into Slack messages
+        with metrics.timer('slack', ''):
+            for part in split_message(message):
+                _post(channel, part)
+                metrics.inc('slack_messages', '')
         print(f'Message was send to Slack Channel \"{channel}\"')
 
     except SlackApiError as e:
         # Handle any Slack API errors that occur
         print(repr(e))
+        metrics.inc('slack_errors', '')
+
+
+class SlackDispatcher:
+    """Sends Slack messages from a background thread.
+
+    Messages are put into a bounded queue and never block the caller. The background thread combines
+    all messages which arrive within 'window' seconds into a single post, split at Slack size limits,
+    and waits out rate limits. When the queue is full the oldest message is dropped.
+
+    """
+
+    def __init__(self, window: Optional[float] = None, queue_size: Optional[int] = None):
+        """Initialize the SlackDispatcher object and start its thread.
+
+        Args:
+            window (Optional[float]): Seconds in which messages are combined (SLACK_WINDOW by default).
+            queue_size (Optional[int]): Number of messages which may wait to be sent (SLACK_QUEUE_SIZE by default).
+
+        """
+        self._window = get_slack_window() if window is None else window
+        self._queue: Queue = Queue(maxsize=queue_size or get_slack_queue_size())
+
+        self._thread = Thread(target=self._run, name='slack', daemon=True)
+        self._thread.start()
+
+    def send(self, message: str):
+        """Schedule a message to be sent without waiting for Slack.
+
+        Args:
+            message (str): The message to send.
+
+        """
+        # If the message is empty, return without sending a Slack message
+        if message == '':
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except Full:
+                # Slack is falling behind, make room by dropping the oldest message
+                try:
+                    self._queue.get_nowait()
+                    print('Slack queue is full, the oldest message was dropped')
+                except Empty:
+                    pass
+
+    def _run(self):
+        """Combine queued messages and post them until 'close' is called."""
+        running = True
+        while running:
+            # Wait for the first message
+            message = self._queue.get()
+            if message is None:
+                break
+
+            # Collect everything else that arrives within the window
+            messages, deadline = [message], monotonic() + self._window
+            while (timeout := deadline - monotonic()) > 0:
+                try:
+                    message = self._queue.get(timeout=timeout)
+                except Empty:
+                    break
+                if message is None:
+                    running = False
+                    break
+                messages.append(message)
+
+            try:
+                message_to_slack(''.join(messages))
+            except Exception as e:
+                # The thread must keep running whatever happens to one post
+                print(repr(e))
+
+    def close(self, timeout: Optional[float] = None):
+        """Send the remaining messages and stop the thread.
+
+        Args:
+            timeout (Optional[float]): Maximal number of seconds to wait for the thread.
+
+        """
+        try:
+            # Closing may wait for room in the queue
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            print('Slack queue is still full, remaining messages are not sent')
+            return
+        self._thread.join(timeout)
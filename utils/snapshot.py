@@ -0,0 +1,114 @@
+import os
+import json
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+from utils.records import Record, RecordBatch
+
+
+class Diff:
+    """Difference between the items scraped on this cycle and on the previous one. """
+
+    __slots__ = ('added', 'removed', 'unchanged')
+
+    def __init__(self, added: List[Record], removed: Set[str], unchanged: List[Record]):
+        # Records with titles which were not scraped on the previous cycle
+        self.added = added
+
+        # Titles of the previous cycle which are gone
+        self.removed = removed
+
+        # Records with titles which were scraped on the previous cycle as well
+        self.unchanged = unchanged
+
+
+class SnapshotStore:
+    """Titles scraped on the previous cycle of every collection.
+
+    Every collection mirrors the last scrape of its website, so the snapshot of the previous cycle tells
+    which items are new and which are gone with set operations, and only those have to be written.
+    Snapshots are kept in memory and, if a directory is given, persisted there so a restarted worker does not
+    have to read whole collections again.
+
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """Initialize the SnapshotStore object.
+
+        Args:
+            directory (Optional[str]): The directory snapshots are persisted to (kept in memory only if not given).
+
+        """
+        self._directory = Path(directory) if directory is not None else None
+        if self._directory is not None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+
+        self._snapshots: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+
+    def _path(self, collection_name: str) -> Path:
+        return self._directory / f'{collection_name}.json'
+
+    def get(self, collection_name: str) -> Optional[Set[str]]:
+        """Get the titles of the previous cycle of a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+
+        Returns:
+            Optional[Set[str]]: The titles, or None if the collection has no snapshot yet.
+
+        """
+        with self._lock:
+            if collection_name not in self._snapshots and self._directory is not None:
+                path = self._path(collection_name)
+                if path.exists():
+                    self._snapshots[collection_name] = set(json.loads(path.read_text(encoding='utf-8')))
+            return self._snapshots.get(collection_name)
+
+    def put(self, collection_name: str, titles: Set[str]):
+        """Replace the snapshot of a collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            titles (Set[str]): The titles the collection holds now.
+
+        """
+        with self._lock:
+            self._snapshots[collection_name] = titles
+            if self._directory is not None:
+                # Replace the file at once so a crash never leaves a partial snapshot
+                path = self._path(collection_name)
+                temporary = path.with_suffix('.tmp')
+                temporary.write_text(json.dumps(list(titles), ensure_ascii=False), encoding='utf-8')
+                os.replace(temporary, path)
+
+    def forget(self, collection_name: str):
+        """Drop the snapshot of a collection, e.g. when another worker took over its website.
+
+        Args:
+            collection_name (str): The name of the collection.
+
+        """
+        with self._lock:
+            if self._snapshots.pop(collection_name, None) is not None and self._directory is not None:
+                self._path(collection_name).unlink(missing_ok=True)
+
+    @staticmethod
+    def diff(previous: Set[str], data: RecordBatch) -> Diff:
+        """Compare the scraped items with the titles of the previous cycle.
+
+        Args:
+            previous (Set[str]): The titles of the previous cycle.
+            data (RecordBatch): The items scraped on this cycle.
+
+        Returns:
+            Diff: The added, removed and unchanged items.
+
+        """
+        added, unchanged, titles = [], [], set()
+        for record in data:
+            titles.add(record.title)
+            (unchanged if record.title in previous else added).append(record)
+        return Diff(added, previous - titles, unchanged)
@@ -0,0 +1,106 @@
+from hashlib import blake2b
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from config.helpers import get_strip_query_params
+
+# Ports which are implied by the scheme
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Size of the hashed dedup key of a link in bytes
+KEY_SIZE = 16
+
+
+class UrlCanonicalizer:
+    """Turns the links of one website into canonical URLs.
+
+    Relative links are resolved against the URL of the website, the host is lowercased without a default port,
+    tracking query parameters and the fragment are dropped and the remaining parameters are sorted. The scheme
+    and the path are kept as the website uses them, so the links still work. Variants of the same article found
+    under different crawl URLs therefore end up with the same link ('link_key' also merges scheme and trailing
+    slash variants).
+
+    """
+
+    def __init__(self, base_url: str, strip_params: Optional[Iterable[str]] = None):
+        """Initialize the UrlCanonicalizer object.
+
+        Args:
+            base_url (str): The URL relative links are resolved against.
+            strip_params (Optional[Iterable[str]]): Query parameters to drop, a trailing '*' matches a prefix
+                (STRIP_QUERY_PARAMS by default).
+
+        """
+        self._base_url = base_url
+        params = [param.lower() for param in (get_strip_query_params() if strip_params is None else strip_params)]
+        self._names = frozenset(param for param in params if not param.endswith('*'))
+        self._prefixes: Tuple[str, ...] = tuple(param[:-1] for param in params if param.endswith('*'))
+
+        # Links repeat across crawl URLs and cycles, so canonical forms are remembered
+        self.canonicalize = lru_cache(maxsize=65536)(self._canonicalize)
+
+    def _strip(self, name: str) -> bool:
+        name = name.lower()
+        return name in self._names or name.startswith(self._prefixes)
+
+    def _canonicalize(self, link: str) -> str:
+        """Get the canonical form of a link.
+
+        Args:
+            link (str): The link as found on the page.
+
+        Returns:
+            str: The canonical absolute URL.
+
+        """
+        parts = urlsplit(urljoin(self._base_url, link.strip()))
+
+        # Links to other protocols (mailto:, javascript:, ...) are left as they are
+        if parts.scheme not in DEFAULT_PORTS:
+            return link
+
+        host = (parts.hostname or '').rstrip('.')
+        if ':' in host:
+            host = f'[{host}]'
+        if parts.port is not None and parts.port != DEFAULT_PORTS[parts.scheme]:
+            host = f'{host}:{parts.port}'
+
+        query = urlencode(sorted(
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if not self._strip(name)
+        ))
+        return urlunsplit((parts.scheme, host, parts.path or '/', query, ''))
+
+
+@lru_cache(maxsize=1024)
+def get_canonicalizer(base_url: str, strip_params: Optional[Tuple[str, ...]] = None) -> UrlCanonicalizer:
+    """Get the canonicalizer of a website, creating it only the first time it is asked for.
+
+    Args:
+        base_url (str): The URL relative links are resolved against.
+        strip_params (Optional[Tuple[str, ...]]): Query parameters to drop (STRIP_QUERY_PARAMS by default).
+
+    Returns:
+        UrlCanonicalizer: The shared canonicalizer.
+
+    """
+    return UrlCanonicalizer(base_url, strip_params)
+
+
+def link_key(link: str) -> bytes:
+    """Hash a canonical link into a fixed-size dedup key.
+
+    The scheme and the trailing slash of the path are left out, so 'http' and 'https' variants of a link and
+    paths with or without the slash get the same key.
+
+    Args:
+        link (str): The canonical link.
+
+    Returns:
+        bytes: The KEY_SIZE bytes long key.
+
+    """
+    parts = urlsplit(link)
+    if parts.scheme in DEFAULT_PORTS:
+        link = urlunsplit(('', parts.netloc, parts.path.rstrip('/') or '/', parts.query, ''))
+    return blake2b(link.encode('utf-8'), digest_size=KEY_SIZE).digest()
@@ -0,0 +1,162 @@
+from time import monotonic
+from datetime import datetime, timezone
+from threading import Thread
+from queue import Empty, Full, Queue
+from typing import List, Optional, Tuple
+
+from utils.metrics import get_metrics
+from utils.records import RecordBatch
+from utils.mongo import MongoDataBase, format_message
+from config.helpers import get_writer_queue_size, get_writer_flush_interval
+
+
+class WriteResult:
+    """Outcome of writing the batch of one website. """
+
+    __slots__ = ('collection_name', 'documents', 'failed')
+
+    def __init__(self, collection_name: str, documents: List[List[str]], failed: bool):
+        # Name of the collection of the website
+        self.collection_name = collection_name
+        # [title, link] of every inserted document
+        self.documents = documents
+        # Whether the website could not be fetched
+        self.failed = failed
+
+    @property
+    def inserted(self) -> int:
+        """The number of inserted documents. """
+        return len(self.documents)
+
+    @property
+    def message(self) -> str:
+        """The Slack message about the inserted documents. """
+        return format_message(self.documents)
+
+
+class MongoWriter:
+    """Writes scraped batches to the database from a background thread.
+
+    Batches are put into a bounded queue, so the crawl does not wait for the database. The background thread
+    collects everything that arrives within 'flush_interval' seconds (or until FLUSH_RECORDS records are
+    waiting) and sends every collection of them one bulk write. When the database
+    falls behind the queue fills up and 'submit' blocks, which slows the crawl down to the speed of the writes.
+    Results are handed back through 'results', so the caller can notify Slack and reschedule the websites.
+
+    """
+
+    # Number of waiting records which triggers a write before the flush interval ends
+    FLUSH_RECORDS = 5000
+
+    def __init__(self, cluster: MongoDataBase,
+                 queue_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """Initialize the MongoWriter object and start its thread.
+
+        Args:
+            cluster (MongoDataBase): The database the batches are written to (used only by the writer thread).
+            queue_size (Optional[int]): Number of batches which may wait to be written (WRITER_QUEUE_SIZE by default).
+            flush_interval (Optional[float]): Seconds in which batches are collected (WRITER_FLUSH_INTERVAL by default).
+
+        """
+        self._cluster = cluster
+        self._flush_interval = get_writer_flush_interval() if flush_interval is None else flush_interval
+        self._queue: Queue = Queue(maxsize=queue_size or get_writer_queue_size())
+        self._results: Queue = Queue()
+
+        self._thread = Thread(target=self._run, name='writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, collection_name: str, data: RecordBatch, failed: bool = False, unchanged: bool = False,
+               partial: bool = False):
+        """Schedule a batch to be written, waiting while the queue is full.
+
+        Args:
+            collection_name (str): The name of the collection to update.
+            data (RecordBatch): The data to update the collection with.
+            failed (bool): Whether the website could not be fetched (passed on to the result).
+            unchanged (bool): Whether the website has not changed, so only the check time is refreshed.
+            partial (bool): Whether the items of some pages are missing, so no document is removed.
+
+        """
+        check = datetime.now(timezone.utc) if unchanged else None
+        item = (collection_name, data, failed, check, partial)
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            # The database is falling behind, the crawl waits for it
+            print('Database writes are falling behind, waiting for the writer')
+            get_metrics().inc('writer_waits', collection_name)
+            self._queue.put(item)
+
+    def results(self, timeout: float = 0) -> List[WriteResult]:
+        """Get the results of finished writes.
+
+        Args:
+            timeout (float): Seconds to wait for the first result if none is ready.
+
+        Returns:
+            List[WriteResult]: The results in the order the writes finished.
+
+        """
+        results = []
+        try:
+            results.append(self._results.get(timeout=timeout) if timeout > 0 else self._results.get_nowait())
+            while True:
+                results.append(self._results.get_nowait())
+        except Empty:
+            return results
+
+    def _flush(self, items: List[Tuple[str, RecordBatch, bool, Optional[datetime], bool]]):
+        """Write the collected batches, one bulk write per collection. """
+        # A website is submitted again only after its result was reported, so every collection appears once
+        for collection_name, data, failed, check, partial in items:
+            try:
+                # Documents of unchanged websites are still on them and must not expire
+                if check is not None:
+                    self._cluster.refresh(collection_name, check)
+                documents = self._cluster.write(data, collection_name, partial)
+            except Exception as error:
+                # The thread must keep running whatever happens to one collection
+                print(repr(error))
+                get_metrics().inc('db_errors', collection_name)
+                documents = []
+            self._results.put(WriteResult(collection_name, documents, failed))
+
+    def _run(self):
+        """Collect queued batches and write them until 'close' is called."""
+        running = True
+        while running:
+            # Wait for the first batch
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # Collect everything else that arrives within the interval, unless enough records are waiting
+            items, records, deadline = [item], len(item[1]), monotonic() + self._flush_interval
+            while records < self.FLUSH_RECORDS and (timeout := deadline - monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                items.append(item)
+                records += len(item[1])
+
+            self._flush(items)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write the remaining batches and stop the thread.
+
+        Args:
+            timeout (Optional[float]): Maximal number of seconds to wait for the thread.
+
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            print('Database writer is still busy, remaining batches are not written')
+            return
+        self._thread.join(timeout)